@@ -0,0 +1,31 @@
+"""
+Measures the time of `import space_wrappers` in fresh interpreters, and
+compares it with importing everything the package exports (which is what
+`import space_wrappers` did before the submodules were loaded lazily).
+Run with the package installed (or on the `PYTHONPATH`) as
+`python benchmarks/bench_import.py`.
+"""
+import subprocess
+import sys
+import timeit
+
+REPEAT = 10
+
+
+def measure(statement):
+    command = [sys.executable, "-c", statement]
+    return min(timeit.repeat(lambda: subprocess.check_call(command), number=1, repeat=REPEAT))
+
+
+def main():
+    baseline = measure("pass")
+    cases = [("import space_wrappers", "import space_wrappers"),
+             ("first wrapper access", "import space_wrappers; space_wrappers.FlattenedActionWrapper"),
+             ("everything (eager)", "from space_wrappers import *")]
+    print("{:<24} {:>10}".format("import", "time [ms]"))
+    for name, statement in cases:
+        print("{:<24} {:>10.1f}".format(name, (measure(statement) - baseline) * 1000))
+
+
+if __name__ == "__main__":
+    main()
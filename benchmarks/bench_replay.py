@@ -0,0 +1,69 @@
+"""
+Measures the step throughput of wrapper stacks on top of a `ReplayEnv`, so
+that the cost of the individual wrappers can be compared without the cost of
+a simulator. Run with the package installed (or on the `PYTHONPATH`) as
+`python benchmarks/bench_replay.py`.
+"""
+import shutil
+import tempfile
+import timeit
+import gym
+import numpy as np
+from gym import spaces
+from space_wrappers import RecordingWrapper, ReplayEnv, StackObservationWrapper, RescaledObservationWrapper, \
+    DiscretizedObservationWrapper, FlattenedObservationWrapper
+
+STEPS = 20000
+EPISODE_LENGTH = 1000
+
+
+class RandomEnv(gym.Env):
+    def __init__(self):
+        super(RandomEnv, self).__init__()
+        self.observation_space = spaces.Box(-1.0, 1.0, shape=(8,), dtype=np.float32)
+        self.action_space = spaces.Discrete(4)
+        self._rng = np.random.RandomState(0)
+        self._t = 0
+
+    def reset(self):
+        self._t = 0
+        return self._rng.uniform(-1, 1, size=8).astype(np.float32)
+
+    def step(self, action):
+        self._t += 1
+        obs = self._rng.uniform(-1, 1, size=8).astype(np.float32)
+        return obs, 1.0, self._t == EPISODE_LENGTH, {}
+
+
+def run(env):
+    env.reset()
+    for _ in range(STEPS):
+        obs, rew, done, info = env.step(0)
+        if done:
+            env.reset()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        recorder = RecordingWrapper(RandomEnv(), directory)
+        run(recorder)
+        recorder.close()
+
+        stacks = [("ReplayEnv", lambda: ReplayEnv(directory)),
+                  ("Rescaled", lambda: RescaledObservationWrapper(ReplayEnv(directory), 0.0, 1.0)),
+                  ("Discretized", lambda: DiscretizedObservationWrapper(ReplayEnv(directory), 5)),
+                  ("Stack(4)", lambda: StackObservationWrapper(ReplayEnv(directory), 4)),
+                  ("Stack(4) + Flattened", lambda: FlattenedObservationWrapper(
+                      StackObservationWrapper(ReplayEnv(directory), 4)))]
+        print("{:<24} {:>14}".format("wrappers", "steps/s"))
+        for name, make in stacks:
+            env = make()
+            duration = min(timeit.repeat(lambda: run(env), number=1, repeat=3))
+            print("{:<24} {:>14.0f}".format(name, STEPS / duration))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compares the throughput of drawing samples one at a time via `space.sample()`
+with drawing whole batches via `space_wrappers.sampling.sample_batch`.
+Run with the package installed (or on the `PYTHONPATH`) as
+`python benchmarks/bench_sampling.py`.
+"""
+import timeit
+import numpy as np
+from gym import spaces
+from space_wrappers.sampling import sample_batch, sample_original_batch
+from space_wrappers.transform import discretize, flatten
+
+COUNT = 10000
+
+
+def report(name, single, batch):
+    print("{:<40} {:>12.0f} {:>14.0f} {:>8.1f}x".format(name, COUNT / single, COUNT / batch, single / batch))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("{:<40} {:>12} {:>14} {:>9}".format("space", "single [1/s]", "batched [1/s]", "speedup"))
+
+    md = spaces.MultiDiscrete([5] * 8)
+    flat = flatten(md).target
+    box = spaces.Box(-1.0, 1.0, shape=(6,), dtype=np.float32)
+    disc = discretize(box, 5)
+    for name, space in [("Discrete (flatten of MultiDiscrete[5]*8)", flat),
+                        ("MultiDiscrete (discretize of Box(6))", disc.target),
+                        ("Box(6)", box)]:
+        single = min(timeit.repeat(lambda: [space.sample() for _ in range(COUNT)], number=1, repeat=3))
+        batch = min(timeit.repeat(lambda: sample_batch(space, COUNT, rng), number=1, repeat=3))
+        report(name, single, batch)
+
+    # sampling in the original space, through the transform
+    single = min(timeit.repeat(lambda: [disc.convert_from(disc.target.sample()) for _ in range(COUNT)],
+                               number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: sample_original_batch(disc, COUNT, rng), number=1, repeat=3))
+    report("Box(6) via discretize transform", single, batch)
+
+
+if __name__ == "__main__":
+    main()
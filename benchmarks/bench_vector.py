@@ -0,0 +1,59 @@
+"""
+Compares stepping envs that release the GIL (simulated by `time.sleep`)
+sequentially with stepping them through a `ThreadedVectorEnv`.
+Run with the package installed (or on the `PYTHONPATH`) as
+`python benchmarks/bench_vector.py`.
+"""
+import time
+import timeit
+import gym
+import numpy as np
+from gym import spaces
+from space_wrappers.transform import discretize
+from space_wrappers.vector import ThreadedVectorEnv
+
+NUM_ENVS = 8
+STEPS = 200
+STEP_TIME = 1e-3
+
+
+class SleepEnv(gym.Env):
+    def __init__(self):
+        super(SleepEnv, self).__init__()
+        self.observation_space = spaces.Box(-1.0, 1.0, shape=(16,), dtype=np.float32)
+        self.action_space = spaces.Box(-1.0, 1.0, shape=(4,), dtype=np.float32)
+
+    def reset(self):
+        return np.zeros(16, dtype=np.float32)
+
+    def step(self, action):
+        time.sleep(STEP_TIME)
+        return np.zeros(16, dtype=np.float32), 0.0, False, {}
+
+
+def main():
+    envs = [SleepEnv() for _ in range(NUM_ENVS)]
+    trafo = discretize(envs[0].action_space, 5)
+    actions = np.zeros((NUM_ENVS, 4), dtype=np.int64)
+
+    def sequential():
+        for _ in range(STEPS):
+            for env, action in zip(envs, actions):
+                env.step(trafo.convert_from(action))
+
+    venv = ThreadedVectorEnv([SleepEnv] * NUM_ENVS, action_transform=trafo)
+    venv.reset()
+
+    def threaded():
+        for _ in range(STEPS):
+            venv.step(actions)
+
+    total = NUM_ENVS * STEPS
+    for name, fn in [("sequential", sequential), ("ThreadedVectorEnv", threaded)]:
+        duration = min(timeit.repeat(fn, number=1, repeat=3))
+        print("{:<20} {:>10.0f} steps/s".format(name, total / duration))
+    venv.close()
+
+
+if __name__ == "__main__":
+    main()
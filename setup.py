@@ -5,6 +5,7 @@ setup(name='space_wrappers',
       install_requires = ['gym'],
       test_rewuires = ["pytest"],
       packages = find_packages(),
+      python_requires = '>=3.7',
       description = 'General purpose wrappers around OpenAI gym wrappers.',
       author = 'Erik Schultheis',
       author_email = 'erik.schultheis@stud.uni-goettingen.de',
@@ -1,7 +1,68 @@
-# import the wrappers
-from .action_wrappers import FlattenedActionWrapper, DiscretizedActionWrapper, RescaledActionWrapper
-from .observation_wrappers import FlattenedObservationWrapper, DiscretizedObservationWrapper, RescaledObservationWrapper
-# import utility functions
-from .classify import is_discrete, is_compound, num_discrete_actions
-from .misc import RepeatActionWrapper, StackObservationWrapper, ToScalarActionWrapper, ContinuingEnvWrapper, \
-    ObserveLastActionWrapper
+import importlib
+
+# The contents of the submodules are loaded lazily, on first access of one of the names below,
+# so that `import space_wrappers` does not import gym (which takes most of the import time).
+_exports = {
+    # wrappers
+    "FlattenedActionWrapper": "action_wrappers",
+    "DiscretizedActionWrapper": "action_wrappers",
+    "RescaledActionWrapper": "action_wrappers",
+    "BranchedActionWrapper": "action_wrappers",
+    "FlattenedObservationWrapper": "observation_wrappers",
+    "DiscretizedObservationWrapper": "observation_wrappers",
+    "RescaledObservationWrapper": "observation_wrappers",
+    "QuantizedObservationWrapper": "observation_wrappers",
+    "DownsampledObservationWrapper": "observation_wrappers",
+    "AdaptiveDiscretizedObservationWrapper": "observation_wrappers",
+    "OneHotObservationWrapper": "observation_wrappers",
+    "RepeatActionWrapper": "misc",
+    "StackObservationWrapper": "misc",
+    "ToScalarActionWrapper": "misc",
+    "ContinuingEnvWrapper": "misc",
+    "VectorContinuingEnvWrapper": "misc",
+    "MetricsRingBuffer": "misc",
+    "ObserveLastActionWrapper": "misc",
+    "VectorObserveLastActionWrapper": "misc",
+    "RecordingWrapper": "recording",
+    "Recording": "recording",
+    "ReplayEnv": "recording",
+    "VectorEnv": "vector",
+    "VectorWrapper": "vector",
+    "ThreadedVectorEnv": "vector",
+    "CountBonusWrapper": "counting",
+    "VectorCountBonusWrapper": "counting",
+    "EnvServer": "remote",
+    "RemoteEnv": "remote",
+    "RemoteVectorEnv": "remote",
+    # utility functions
+    "is_discrete": "classify",
+    "is_compound": "classify",
+    "num_discrete_actions": "classify",
+    "AdaptivePartition": "adaptive",
+    "sample_batch": "sampling",
+    "flat_mask": "masking",
+    "masked_argmax": "masking",
+    "masked_sample": "masking",
+    "count_table": "counting",
+}
+
+_submodules = {"action_wrappers", "observation_wrappers", "misc", "recording", "vector", "remote", "classify",
+               "transform", "sampling", "masking", "aio", "adaptive",
+               "counting"}
+
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        value = getattr(importlib.import_module("." + _exports[name], __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _submodules)
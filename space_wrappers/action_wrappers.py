@@ -1,5 +1,11 @@
 from gym import ActionWrapper
-from .transform import *
+from .transform import flatten, discretize, rescale, branch, validated, ValidationStats
+
+__all__ = ["FlattenedActionWrapper", "DiscretizedActionWrapper", "RescaledActionWrapper", "BranchedActionWrapper"]
+
+# All wrappers in this file accept `validate`, the fraction of actions that are checked to lie in
+# the action space of the wrapped env (see `transform.validated()`). The violation counters are
+# available as `validation`.
 
 
 class FlattenedActionWrapper(ActionWrapper):
@@ -10,9 +16,11 @@ class FlattenedActionWrapper(ActionWrapper):
         vector valued action.
         The `reverse_action` method is currently not implemented.
     """
-    def __init__(self, env):
+    def __init__(self, env, validate=0.0):
         super(FlattenedActionWrapper, self).__init__(env)
         trafo = flatten(env.action_space)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.action_space = trafo.target
         self.action = trafo.convert_from
 
@@ -22,9 +30,11 @@ class DiscretizedActionWrapper(ActionWrapper):
         `transform.discretize()`.
         The `reverse_action` method is currently not implemented.
     """
-    def __init__(self, env, steps):
+    def __init__(self, env, steps, validate=0.0):
         super(DiscretizedActionWrapper, self).__init__(env)
         trafo = discretize(env.action_space, steps)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.action_space = trafo.target
         self.action = trafo.convert_from
 
@@ -37,8 +47,32 @@ class RescaledActionWrapper(ActionWrapper):
         but the environments actions are non-symmetric.
         The `reverse_action` method is currently not implemented.
     """
-    def __init__(self, env, low, high):
+    def __init__(self, env, low, high, validate=0.0):
         super(RescaledActionWrapper, self).__init__(env)
         trafo = rescale(env.action_space, low=low, high=high)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
+        self.action_space = trafo.target
+        self.action = trafo.convert_from
+
+
+class BranchedActionWrapper(ActionWrapper):
+    """ Discretizes each dimension of the action space of
+        an `env` separately using `transform.branch()`.
+        The resulting `MultiDiscrete` action space is suitable
+        for agents with one output head per action dimension
+        (action branching), whose output size grows linearly
+        in the number of action dimensions, whereas with
+        `DiscretizedActionWrapper` + `FlattenedActionWrapper`
+        it grows exponentially. Besides indices, the wrapper
+        accepts per-branch Q-values or logits as action, and
+        selects the maximum of each branch.
+        The `reverse_action` method is currently not implemented.
+    """
+    def __init__(self, env, steps, validate=0.0):
+        super(BranchedActionWrapper, self).__init__(env)
+        trafo = branch(env.action_space, steps)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.action_space = trafo.target
         self.action = trafo.convert_from
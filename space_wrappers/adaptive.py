@@ -0,0 +1,235 @@
+# adaptive discretization of continuous spaces
+from gym import spaces
+import numpy as np
+from .classify import space_info, is_discrete, invalidate_space_info
+from .transform import Transform
+
+__all__ = ["AdaptivePartition", "adaptive_discretize"]
+
+# An `AdaptivePartition` divides a bounded `Box` into axis aligned cells, which are the leaves
+# of a k-d tree. It starts with a single cell spanning the whole space; a cell is split in half
+# (along its widest dimension, measured relative to the bounds of the space) once it has been
+# visited `split_count` times, or, if `split_variance` is given, once the values reported for it
+# have a variance larger than that. This continues until `max_cells` cells exist.
+#
+# The tree is stored in preallocated arrays with one entry per node, so that a batch of points
+# is assigned to cells by descending all of them in lockstep, one level per numpy operation.
+# When a cell is split, its lower half keeps the cell id and the upper half gets the next free
+# id, so cell ids are always `0..n-1` and ids that were handed out earlier remain valid (if
+# coarser) descriptions of the region.
+
+
+class AdaptivePartition(object):
+    """
+    Adaptive k-d tree partition of a bounded `Box` space. Calling it maps
+    a point to the id of its cell; the cell ids form the `Discrete` space
+    `space`, whose `n` grows as cells are split.
+    """
+    def __init__(self, space, max_cells, split_count=100, split_variance=None):
+        """
+        :param gym.spaces.Box space: The space to partition. Needs finite bounds.
+        :param int max_cells: The maximum number of cells.
+        :param int split_count: Number of visits (or of reported values, if
+            `split_variance` is given) after which a cell is split.
+        :param float split_variance: If given, cells are only split once the
+            variance of their reported values exceeds this.
+        :raises ValueError: If the bounds of `space` are not finite, or `max_cells`
+            or `split_count` is less than one.
+        """
+        if not space_info(space).bounded:
+            raise ValueError("Cannot partition space {} with infinite bounds".format(space))
+        if max_cells < 1:
+            raise ValueError("Need at least one cell, got {}".format(max_cells))
+        if split_count < 1:
+            raise ValueError("split_count needs to be positive, got {}".format(split_count))
+
+        self.original = space
+        self.space = spaces.Discrete(1)
+        self.max_cells = int(max_cells)
+        self.split_count = split_count
+        self.split_variance = split_variance
+
+        self._low = space.low.astype(np.float64).ravel()
+        self._range = space.high.astype(np.float64).ravel() - self._low
+        # degenerate dimensions are never split, and map to zero.
+        self._inv_range = np.divide(1.0, self._range, out=np.zeros_like(self._range), where=self._range != 0)
+        dim = len(self._low)
+
+        # tree nodes, in coordinates normalized to [0, 1]. leaves have feature -1.
+        nodes = 2 * self.max_cells - 1
+        self._feature = np.full(nodes, -1, dtype=np.int64)
+        self._threshold = np.zeros(nodes, dtype=np.float64)
+        self._left = np.zeros(nodes, dtype=np.int64)
+        self._right = np.zeros(nodes, dtype=np.int64)
+        self._cell = np.zeros(nodes, dtype=np.int64)
+        self._node_low = np.zeros((nodes, dim), dtype=np.float64)
+        self._node_high = np.ones((nodes, dim), dtype=np.float64)
+        self._node_high[:, self._range == 0] = 0.0
+        self._num_nodes = 1
+
+        # per cell data
+        self._leaf = np.zeros(self.max_cells, dtype=np.int64)
+        self.counts = np.zeros(self.max_cells, dtype=np.int64)
+        self._value_counts = np.zeros(self.max_cells, dtype=np.int64)
+        self._value_sum = np.zeros(self.max_cells, dtype=np.float64)
+        self._value_sum_sq = np.zeros(self.max_cells, dtype=np.float64)
+
+    @property
+    def num_cells(self):
+        return self.space.n
+
+    def __call__(self, x):
+        return int(self.batch(np.asarray(x)[None])[0])
+
+    def batch(self, x):
+        """
+        Maps a batch of points to their cell ids.
+        :param np.ndarray x: Points of shape `(batch,) + space.shape`.
+        :return np.ndarray: The int64 cell ids, of shape `(batch,)`.
+        """
+        u = (np.reshape(x, (len(x), -1)) - self._low) * self._inv_range
+        node = np.zeros(len(u), dtype=np.int64)
+        active = np.flatnonzero(self._feature[node] >= 0)
+        while len(active) > 0:
+            current = node[active]
+            feature = self._feature[current]
+            upper = u[active, feature] >= self._threshold[current]
+            current = np.where(upper, self._right[current], self._left[current])
+            node[active] = current
+            active = active[self._feature[current] >= 0]
+        return self._cell[node]
+
+    def update(self, x, values=None):
+        """
+        Records visits of the batch of points `x` (and optionally the
+        corresponding `values`) and splits the cells that have become due.
+        :param np.ndarray x: Points of shape `(batch,) + space.shape`.
+        :param np.ndarray values: Values of shape `(batch,)`, e.g. returns or
+            TD errors, whose variance is compared to `split_variance`.
+        :return np.ndarray: The cell ids of `x`, before splitting.
+        """
+        cells = self.batch(x)
+        # only the visited cells are touched, so that an update does not cost O(max_cells).
+        np.add.at(self.counts, cells, 1)
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            np.add.at(self._value_counts, cells, 1)
+            np.add.at(self._value_sum, cells, values)
+            np.add.at(self._value_sum_sq, cells, values * values)
+        self._split_due(np.unique(cells))
+        return cells
+
+    def _split_due(self, cells):
+        # statistics only change for visited cells, so no other cell can have become due.
+        free = self.max_cells - self.space.n
+        if free == 0:
+            return
+        if self.split_variance is None:
+            counts = self.counts[cells]
+            due = counts >= self.split_count
+        else:
+            counts = self._value_counts[cells]
+            mean = self._value_sum[cells] / np.maximum(counts, 1)
+            variance = self._value_sum_sq[cells] / np.maximum(counts, 1) - mean * mean
+            due = (counts >= self.split_count) & (variance > self.split_variance)
+        # cells whose every dimension is degenerate cannot be split.
+        leaves = self._leaf[cells]
+        due &= (self._node_high[leaves] > self._node_low[leaves]).any(axis=1)
+        due = np.flatnonzero(due)
+        if len(due) > free:
+            # prefer the most visited cells
+            due = due[np.argsort(-counts[due], kind="stable")[:free]]
+        if len(due) > 0:
+            self._split(cells[due])
+
+    def _split(self, cells):
+        k = len(cells)
+        n = self.space.n
+        nodes = self._leaf[cells]
+        rows = np.arange(k)
+        low = self._node_low[nodes]
+        high = self._node_high[nodes]
+        feature = np.argmax(high - low, axis=1)
+        threshold = (low[rows, feature] + high[rows, feature]) / 2
+
+        left = self._num_nodes + 2 * rows
+        right = left + 1
+        self._num_nodes += 2 * k
+        self._feature[nodes] = feature
+        self._threshold[nodes] = threshold
+        self._left[nodes] = left
+        self._right[nodes] = right
+
+        high[rows, feature] = threshold
+        self._node_low[left] = low
+        self._node_high[left] = high
+        high[rows, feature] = self._node_high[nodes, feature]
+        low[rows, feature] = threshold
+        self._node_low[right] = low
+        self._node_high[right] = high
+
+        new_cells = n + rows
+        self._cell[left] = cells
+        self._cell[right] = new_cells
+        self._leaf[cells] = left
+        self._leaf[new_cells] = right
+        for stat in (self.counts, self._value_counts, self._value_sum, self._value_sum_sq):
+            stat[cells] = 0
+
+        self.space.n = n + k
+        invalidate_space_info(self.space)
+
+    def bounds(self, cells):
+        """
+        Returns the lower and upper corners of the given cells.
+        :param np.ndarray cells: Cell ids of shape `(batch,)`.
+        :return: Tuple of two arrays of shape `(batch,) + space.shape`.
+        """
+        leaves = self._leaf[np.asarray(cells)]
+        shape = np.shape(cells) + self.original.shape
+        low = self._low + self._node_low[leaves] * self._range
+        high = self._low + self._node_high[leaves] * self._range
+        return low.reshape(shape), high.reshape(shape)
+
+
+class _CellCenter(object):
+    def __init__(self, partition):
+        self._partition = partition
+
+    def __call__(self, x):
+        return self.batch(np.asarray(x)[None])[0]
+
+    def batch(self, x):
+        low, high = self._partition.bounds(x)
+        return ((low + high) / 2).astype(self._partition.original.dtype)
+
+
+def adaptive_discretize(space, max_cells, split_count=100, split_variance=None):
+    """
+    Creates an adaptive discretization of the bounded `Box` `space`, in
+    which the resolution is refined where it is needed, instead of being
+    the same everywhere as for `discretize()`. `convert_to` is the
+    `AdaptivePartition` that maps points to cell ids; call its `update`
+    method with batches of visited points (and values) to refine it online.
+    `convert_from` maps a cell id to the center of the cell. The target space
+    is a `Discrete` that grows (in place) as cells are split, up to
+    `max_cells`; consumers that allocate per-state storage should be sized
+    for `max_cells` states rather than for the current `target.n`.
+    :param gym.Space space: The space to be discretized.
+    :param int max_cells: The maximum number of cells.
+    :param int split_count: Number of visits after which a cell is split.
+    :param float split_variance: If given, cells are split only if the variance of
+        the values passed to `update` exceeds this.
+    :return Transform: A `Transform` to the discretized space.
+    :raises TypeError: If `space` is discrete.
+            ValueError: If the bounds of `space` are not finite.
+    """
+    if is_discrete(space):
+        raise TypeError("Cannot adaptively discretize discrete space {}".format(space))
+
+    if not isinstance(space, spaces.Box):
+        raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+
+    partition = AdaptivePartition(space, max_cells, split_count=split_count, split_variance=split_variance)
+    return Transform(original=space, target=partition.space, convert_to=partition,
+                     convert_from=_CellCenter(partition))
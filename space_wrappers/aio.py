@@ -0,0 +1,180 @@
+# asyncio counterparts of `step` and `reset`
+from gym import ActionWrapper, ObservationWrapper, RewardWrapper, Wrapper
+from .misc import RepeatActionWrapper, StackObservationWrapper, ObserveLastActionWrapper, ContinuingEnvWrapper
+from .recording import RecordingWrapper
+from .counting import CountBonusWrapper
+
+__all__ = ["step_async", "reset_async", "register"]
+
+# The functions in this file allow driving a stack of wrappers from an asyncio event loop. The
+# innermost env may provide coroutine methods `step_async(action)` and `reset_async(**kwargs)`
+# (e.g. because it talks to a remote simulator); these are awaited, and the transformations of
+# all wrappers on top of it run inline in the event loop. Innermost envs without these methods
+# are stepped synchronously.
+#
+# Each wrapper needs an async implementation of its `step` and `reset`. These are looked up for
+# the class that defines the `step` (`reset`) method that is used by the wrapper, so wrappers
+# that only override e.g. `ObservationWrapper.observation` are handled automatically. Async
+# implementations for further wrapper classes can be added with `register`. For wrappers for
+# which no implementation is found, the synchronous method is called.
+
+_step_handlers = {}
+_reset_handlers = {}
+
+
+def register(cls, step=None, reset=None):
+    """
+    Registers async implementations for the `step` and/or `reset` methods of the
+    wrapper class `cls`.
+    :param type cls: The wrapper class.
+    :param step: Coroutine function `step(wrapper, action)`.
+    :param reset: Coroutine function `reset(wrapper, **kwargs)`.
+    """
+    if step is not None:
+        _step_handlers[cls] = step
+    if reset is not None:
+        _reset_handlers[cls] = reset
+
+
+def _defining_class(env, name):
+    for cls in type(env).__mro__:
+        if name in cls.__dict__:
+            return cls
+
+
+async def step_async(env, action):
+    """
+    Awaitable counterpart of `env.step(action)`.
+    :param gym.Env env: The (wrapped) env.
+    :param action: The action.
+    :return: A tuple of observation, reward, done flag and info dict.
+    """
+    if not isinstance(env, Wrapper):
+        if hasattr(env, "step_async"):
+            return await env.step_async(action)
+        return env.step(action)
+
+    handler = _step_handlers.get(_defining_class(env, "step"))
+    if handler is None:
+        return env.step(action)
+    return await handler(env, action)
+
+
+async def reset_async(env, **kwargs):
+    """
+    Awaitable counterpart of `env.reset(**kwargs)`.
+    :param gym.Env env: The (wrapped) env.
+    :return: The initial observation.
+    """
+    if not isinstance(env, Wrapper):
+        if hasattr(env, "reset_async"):
+            return await env.reset_async(**kwargs)
+        return env.reset(**kwargs)
+
+    handler = _reset_handlers.get(_defining_class(env, "reset"))
+    if handler is None:
+        return env.reset(**kwargs)
+    return await handler(env, **kwargs)
+
+
+# gym base classes
+async def _wrapper_step(wrapper, action):
+    return await step_async(wrapper.env, action)
+
+
+async def _wrapper_reset(wrapper, **kwargs):
+    return await reset_async(wrapper.env, **kwargs)
+
+
+async def _action_wrapper_step(wrapper, action):
+    return await step_async(wrapper.env, wrapper.action(action))
+
+
+async def _observation_wrapper_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    return wrapper.observation(obs), reward, done, info
+
+
+async def _observation_wrapper_reset(wrapper, **kwargs):
+    return wrapper.observation(await reset_async(wrapper.env, **kwargs))
+
+
+async def _reward_wrapper_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    return obs, wrapper.reward(reward), done, info
+
+
+register(Wrapper, step=_wrapper_step, reset=_wrapper_reset)
+# some gym versions define pass-through `reset` methods in ActionWrapper and RewardWrapper
+register(ActionWrapper, step=_action_wrapper_step, reset=_wrapper_reset)
+register(ObservationWrapper, step=_observation_wrapper_step, reset=_observation_wrapper_reset)
+register(RewardWrapper, step=_reward_wrapper_step, reset=_wrapper_reset)
+
+
+# wrappers of this package
+async def _repeat_step(wrapper, action):
+    done = False
+    total_reward = 0
+    current_step = 0
+    while current_step < (wrapper.repeat_count + 1) and not done:
+        wrapper._step_count += 1
+        obs, reward, done, info = await step_async(wrapper.env, action)
+        total_reward += reward
+        current_step += 1
+    return obs, total_reward, done, wrapper._add_step_count(info)
+
+
+async def _stack_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    return wrapper._push(obs), reward, done, info
+
+
+async def _stack_reset(wrapper, **kwargs):
+    return wrapper._fill(await reset_async(wrapper.env, **kwargs))
+
+
+async def _last_action_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    return wrapper._observe(obs, action), reward, done, info
+
+
+async def _last_action_reset(wrapper, **kwargs):
+    obs = await reset_async(wrapper.env, **kwargs)
+    return wrapper._observe(obs, wrapper._default_action)
+
+
+async def _continuing_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    reward, done = wrapper._continue(reward, done)
+    return obs, reward, done, info
+
+
+async def _continuing_reset(wrapper, **kwargs):
+    wrapper._reset_counters()
+    return await reset_async(wrapper.env, **kwargs)
+
+
+async def _recording_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    wrapper._record_step(obs, action, reward, done)
+    return obs, reward, done, info
+
+
+async def _recording_reset(wrapper, **kwargs):
+    obs = await reset_async(wrapper.env, **kwargs)
+    wrapper._record_reset(obs)
+    return obs
+
+
+async def _count_bonus_step(wrapper, action):
+    obs, reward, done, info = await step_async(wrapper.env, action)
+    reward, info = wrapper._add_bonus(obs, reward, info)
+    return obs, reward, done, info
+
+
+register(RepeatActionWrapper, step=_repeat_step)
+register(StackObservationWrapper, step=_stack_step, reset=_stack_reset)
+register(ObserveLastActionWrapper, step=_last_action_step, reset=_last_action_reset)
+register(ContinuingEnvWrapper, step=_continuing_step, reset=_continuing_reset)
+register(RecordingWrapper, step=_recording_step, reset=_recording_reset)
+register(CountBonusWrapper, step=_count_bonus_step)
@@ -1,6 +1,12 @@
 # classify spaces
 import gym
 from gym import spaces
+from collections import namedtuple
+import numpy as np
+import weakref
+
+__all__ = ["assert_space", "SpaceInfo", "space_info", "invalidate_space_info", "is_discrete", "is_compound", "is_flat",
+           "num_discrete_actions"]
 
 
 def assert_space(space):
@@ -9,6 +15,99 @@ def assert_space(space):
         raise TypeError("Expected a gym.spaces.Space, got {}".format(type(space)))
 
 
+SpaceInfo = namedtuple('SpaceInfo', ['discrete', 'compound', 'flat', 'flat_size', 'num_discrete_actions',
+                                     'cardinality', 'dtype', 'shape', 'offsets', 'bounded'])
+SpaceInfo.__doc__ = """ Properties of a space, as returned by `space_info`.
+    discrete, compound, flat: see `is_discrete`, `is_compound` and `is_flat`.
+    flat_size: Number of entries of a value in the layout produced by `transform.flatten()`,
+               i.e. one for spaces that are flattened to a single `Discrete`.
+    num_discrete_actions: see `num_discrete_actions`; `None` if not available.
+    cardinality: Number of distinct values of a discrete space; `None` for continuous spaces.
+    dtype, shape: The dtype and shape of the space; `None` for `Tuple` spaces.
+    offsets: Start positions of the subspaces of a `Tuple` in the flattened layout (`(0,)` for
+             all other spaces).
+    bounded: Whether all values lie in a bounded range.
+"""
+
+# cache of the infos of all spaces that have been inspected, by `id`. Entries are removed
+# when the space is garbage collected.
+_info_cache = {}
+
+
+def _product(values):
+    result = 1
+    for v in values:
+        result *= int(v)
+    return result
+
+
+def _compute_info(space):
+    dtype = getattr(space, "dtype", None)
+    if isinstance(space, spaces.Discrete):
+        return SpaceInfo(discrete=True, compound=False, flat=True, flat_size=1, num_discrete_actions=(space.n,),
+                         cardinality=int(space.n), dtype=dtype, shape=(), offsets=(0,), bounded=True)
+    elif isinstance(space, spaces.MultiDiscrete):
+        nvec = tuple(np.asarray(space.nvec).flatten())
+        return SpaceInfo(discrete=True, compound=True, flat=False, flat_size=1, num_discrete_actions=nvec,
+                         cardinality=_product(nvec), dtype=dtype, shape=space.shape, offsets=(0,), bounded=True)
+    elif isinstance(space, spaces.MultiBinary):
+        count = _product(np.atleast_1d(space.n))
+        return SpaceInfo(discrete=True, compound=True, flat=False, flat_size=1, num_discrete_actions=(2,) * count,
+                         cardinality=2 ** count, dtype=dtype, shape=space.shape, offsets=(0,), bounded=True)
+    elif isinstance(space, spaces.Box):
+        shape = space.shape
+        bounded = bool(np.isfinite(space.low).all() and np.isfinite(space.high).all())
+        return SpaceInfo(discrete=False, compound=len(shape) != 1 or shape[0] != 1, flat=len(shape) <= 1,
+                         flat_size=_product(shape), num_discrete_actions=None, cardinality=None, dtype=dtype,
+                         shape=shape, offsets=(0,), bounded=bounded)
+    elif isinstance(space, spaces.Tuple):
+        subs = [space_info(sub) for sub in space.spaces]
+        discrete = all(sub.discrete for sub in subs)
+        offsets = tuple(int(o) for o in np.cumsum([0] + [sub.flat_size for sub in subs[:-1]]))
+        return SpaceInfo(discrete=discrete, compound=True, flat=False, flat_size=sum(sub.flat_size for sub in subs),
+                         num_discrete_actions=None,
+                         cardinality=_product(sub.cardinality for sub in subs) if discrete else None,
+                         dtype=None, shape=None, offsets=offsets, bounded=all(sub.bounded for sub in subs))
+
+    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+
+
+def space_info(space):
+    """
+    Gets the `SpaceInfo` describing `space`. It is computed on the first call
+    for each space object, and afterwards looked up in a cache. Spaces should
+    therefore not be modified after they have been inspected.
+    :param gym.Space space: The space to inspect.
+    :return SpaceInfo: The properties of `space`.
+    :raises TypeError: If the space is no `gym.Space`.
+            NotImplementedError: If the type of the space is not known.
+    """
+    # only spaces that are still alive are in the cache, so no other object can have the same id.
+    key = id(space)
+    cached = _info_cache.get(key)
+    if cached is not None:
+        return cached[1]
+
+    assert_space(space)
+    info = _compute_info(space)
+    try:
+        ref = weakref.ref(space, lambda r, key=key: _info_cache.pop(key, None))
+    except TypeError:  # pragma: no cover
+        # space cannot be weakly referenced; do not cache
+        return info
+    _info_cache[key] = (ref, info)
+    return info
+
+
+def invalidate_space_info(space):
+    """
+    Removes the cached `SpaceInfo` of `space`. Needs to be called after
+    modifying a space that has already been inspected.
+    :param gym.Space space: The modified space.
+    """
+    _info_cache.pop(id(space), None)
+
+
 def is_discrete(space):
     """ Checks if a space is discrete. A space is considered to
         be discrete if it is derived from Discrete, MultiDiscrete
@@ -17,16 +116,7 @@ def is_discrete(space):
         subspaces.
         :raises TypeError: If the space is no `gym.Space`.
     """
-    assert_space(space)
-
-    if isinstance(space, (spaces.Discrete, spaces.MultiDiscrete, spaces.MultiBinary)):
-        return True
-    elif isinstance(space, spaces.Box):
-        return False
-    elif isinstance(space, spaces.Tuple):
-        return all(map(is_discrete, space.spaces))
-
-    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+    return space_info(space).discrete
 
 
 def is_compound(space):
@@ -36,18 +126,7 @@ def is_compound(space):
         compound).
         :raises TypeError: If the space is no `gym.Space`.
     """
-    assert_space(space)
-
-    if isinstance(space, spaces.Discrete):
-        return False
-    elif isinstance(space, spaces.Box):
-        return len(space.shape) != 1 or space.shape[0] != 1
-    elif isinstance(space, (spaces.MultiDiscrete, spaces.MultiBinary)):
-        return True
-    elif isinstance(space, spaces.Tuple):
-        return True
-
-    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+    return space_info(space).compound
 
 
 def is_flat(space):
@@ -56,18 +135,7 @@ def is_flat(space):
     :param gym.Space space: The space to check for flatness.
     :return: Whether the space is flat.
     """
-    assert_space(space)
-
-    if isinstance(space, spaces.Discrete):
-        return True
-    elif isinstance(space, spaces.Box):
-        return len(space.shape) <= 1
-    elif isinstance(space, (spaces.MultiDiscrete, spaces.MultiBinary)):
-        return False
-    elif isinstance(space, spaces.Tuple):
-        return False
-
-    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+    return space_info(space).flat
 
 
 def num_discrete_actions(space):
@@ -77,18 +145,10 @@ def num_discrete_actions(space):
     :return tuple: Tuple of integers containing the number of discrete actions.
     :raises TypeError: If the space is no `gym.Space`.
     """
-    assert_space(space)
-
-    if not is_discrete(space):
+    info = space_info(space)
+    if not info.discrete:
         raise TypeError("Space {} is not discrete".format(space))
 
-    if isinstance(space, spaces.Discrete):
-        return tuple((space.n,))
-    elif isinstance(space, spaces.MultiDiscrete):
-        # add +1 here as space.high is an inclusive bound
-        return tuple(space.nvec)
-    elif isinstance(space, spaces.MultiBinary):
-        return (2,) * space.n
-
-    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))  # pragma: no cover
-
+    if info.num_discrete_actions is None:
+        raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+    return info.num_discrete_actions
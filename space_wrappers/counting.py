@@ -0,0 +1,221 @@
+# visitation counts over discrete observations
+from gym import Wrapper
+from gym import spaces
+import numpy as np
+from .vector import VectorWrapper
+
+__all__ = ["DenseCountTable", "HashedCountTable", "count_table", "CountBonusWrapper", "VectorCountBonusWrapper"]
+
+# The count tables in this file count how often each state of a flat `Discrete` space (e.g. the
+# result of `DiscretizedObservationWrapper` and `FlattenedObservationWrapper`) has been visited.
+# Both are updated with whole batches of states, as produced by a vector env, in a constant
+# number of numpy operations per batch (per probe, for the hashed table).
+#  * `DenseCountTable` keeps one counter per state, and is used for spaces of up to `max_dense`
+#    states.
+#  * `HashedCountTable` keeps a fixed number of (state, counter) slots in an open addressing hash
+#    table with (bounded) linear probing, so its memory does not depend on the size of the space.
+#    States that find no free slot, because the table is (locally) full, share the counter of
+#    the slot their hash points to, i.e. their counts become overestimates.
+
+_EMPTY = -1
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class DenseCountTable(object):
+    """
+    Visitation counts with one counter for each of `n` states.
+    """
+    def __init__(self, n):
+        self.counts = np.zeros(n, dtype=np.int64)
+
+    def update(self, states):
+        """
+        Increments the counts of a batch of states.
+        :param np.ndarray states: The int states, of shape `(batch,)`. May contain duplicates.
+        :return np.ndarray: The counts of `states` after the update.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        np.add.at(self.counts, states, 1)
+        return self.counts[states]
+
+    def get(self, states):
+        """
+        :param np.ndarray states: The int states, of shape `(batch,)`.
+        :return np.ndarray: The current counts of `states`.
+        """
+        return self.counts[np.asarray(states, dtype=np.int64)]
+
+
+class HashedCountTable(object):
+    """
+    Visitation counts for up to `capacity` distinct states, stored in an
+    open addressing hash table.
+    """
+    def __init__(self, capacity, max_probes=32):
+        """
+        :param int capacity: The number of slots. Rounded up to a power of two.
+        :param int max_probes: The number of slots, starting at the one the
+            hash of a state points to, in which the state may be stored.
+        """
+        bits = max(int(np.ceil(np.log2(capacity))), 1)
+        self.capacity = 1 << bits
+        self.max_probes = min(max_probes, self.capacity)
+        self._shift = np.uint64(64 - bits)
+        self._keys = np.full(self.capacity, _EMPTY, dtype=np.int64)
+        self._counts = np.zeros(self.capacity, dtype=np.int64)
+        self.size = 0
+        self.overflow = 0
+
+    def _home(self, keys):
+        return ((keys.astype(np.uint64) * _HASH_MULTIPLIER) >> self._shift).astype(np.int64)
+
+    def _slots(self, keys, insert):
+        # all keys are probed in lockstep, one position per iteration. keys are only ever stored
+        # within `max_probes` positions of their home slot, so lookups can stop after that.
+        home = self._home(keys)
+        slots = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        for probe in range(self.max_probes):
+            position = (home[pending] + probe) & (self.capacity - 1)
+            stored = self._keys[position]
+            resolved = stored == keys[pending]
+            slots[pending[resolved]] = position[resolved]
+            empty = stored == _EMPTY
+            if insert:
+                # several keys may probe the same empty slot; the first one claims it.
+                claimed, first = np.unique(position[empty], return_index=True)
+                winners = np.flatnonzero(empty)[first]
+                self._keys[claimed] = keys[pending[winners]]
+                slots[pending[winners]] = claimed
+                resolved[winners] = True
+                self.size += len(claimed)
+            else:
+                # not stored
+                resolved |= empty
+            pending = pending[~resolved]
+            if len(pending) == 0:
+                break
+
+        # keys that did not find a free slot share the counter of their home slot.
+        slots[pending] = home[pending]
+        if insert:
+            self.overflow += len(pending)
+        return slots
+
+    def update(self, states):
+        """
+        Increments the counts of a batch of states.
+        :param np.ndarray states: The int states, of shape `(batch,)`. May contain duplicates.
+        :return np.ndarray: The counts of `states` after the update.
+        """
+        keys, inverse, counts = np.unique(np.asarray(states, dtype=np.int64), return_inverse=True,
+                                          return_counts=True)
+        slots = self._slots(keys, insert=True)
+        np.add.at(self._counts, slots, counts)
+        return self._counts[slots][inverse]
+
+    def get(self, states):
+        """
+        :param np.ndarray states: The int states, of shape `(batch,)`.
+        :return np.ndarray: The current counts of `states`.
+        """
+        keys = np.asarray(states, dtype=np.int64).ravel()
+        slots = self._slots(keys, insert=False)
+        return np.where(slots >= 0, self._counts[slots], 0)
+
+
+def count_table(space, max_dense=1 << 22, capacity=1 << 20, n=None):
+    """
+    Creates a count table for the states of `space`, dense if it has at most
+    `max_dense` states and hashed with `capacity` slots otherwise.
+    :param gym.spaces.Discrete space: The (flat) state space.
+    :param int max_dense: The largest number of states for which a dense table is used.
+    :param int capacity: The number of slots of a hashed table.
+    :param int n: The number of states to provide for. Defaults to `space.n`; spaces that
+        grow, such as that of `AdaptiveDiscretizedObservationWrapper`, need their final size.
+    :return: A `DenseCountTable` or `HashedCountTable`.
+    :raises TypeError: If `space` is not a `Discrete` space.
+            ValueError: If `n` is less than `space.n`.
+    """
+    if not isinstance(space, spaces.Discrete):
+        raise TypeError("Can only count states of a Discrete space, got {}. Use transform.flatten() first.".format(
+            space))
+    if n is None:
+        n = space.n
+    elif n < space.n:
+        raise ValueError("Cannot count {} states of {} in a table for {}".format(space.n, space, n))
+    if n <= max_dense:
+        return DenseCountTable(n)
+    return HashedCountTable(capacity)
+
+
+class CountBonusWrapper(Wrapper):
+    """
+    Counts the visits of each state of an env with a `Discrete` observation
+    space and provides an exploration bonus of `scale / sqrt(count)` for the
+    state reached by each step, as `info["count_bonus"]` or, if
+    `add_to_reward` is set, added to the reward.
+    """
+    def __init__(self, env, scale=1.0, add_to_reward=False, max_dense=1 << 22, capacity=1 << 20, n=None):
+        """
+        :param gym.Env env: The environment to wrap.
+        :param float scale: The bonus for a state that has been visited once.
+        :param bool add_to_reward: Whether to add the bonus to the reward.
+        :param int max_dense: See `count_table()`.
+        :param int capacity: See `count_table()`.
+        :param int n: See `count_table()`.
+        """
+        super(CountBonusWrapper, self).__init__(env)
+        self.counts = count_table(env.observation_space, max_dense=max_dense, capacity=capacity, n=n)
+        self.scale = scale
+        self.add_to_reward = add_to_reward
+        self._state = np.zeros(1, dtype=np.int64)
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        reward, info = self._add_bonus(obs, reward, info)
+        return obs, reward, done, info
+
+    def _add_bonus(self, obs, reward, info):
+        self._state[0] = obs
+        bonus = self.scale / np.sqrt(self.counts.update(self._state)[0])
+        if self.add_to_reward:
+            return reward + bonus, info
+        info["count_bonus"] = bonus
+        return reward, info
+
+
+class VectorCountBonusWrapper(VectorWrapper):
+    """
+    Vector env version of `CountBonusWrapper`. The counts of all sub-envs
+    are kept in a single table, which is updated once per step. For
+    sub-envs that have been reset, the terminal observation is counted.
+    """
+    def __init__(self, venv, scale=1.0, add_to_reward=False, max_dense=1 << 22, capacity=1 << 20, n=None):
+        """
+        :param VectorEnv venv: The vector env to wrap.
+        :param float scale: The bonus for a state that has been visited once.
+        :param bool add_to_reward: Whether to add the bonus to the rewards.
+        :param int max_dense: See `count_table()`.
+        :param int capacity: See `count_table()`.
+        :param int n: See `count_table()`.
+        """
+        super(VectorCountBonusWrapper, self).__init__(venv)
+        self.counts = count_table(venv.observation_space, max_dense=max_dense, capacity=capacity, n=n)
+        self.scale = scale
+        self.add_to_reward = add_to_reward
+
+    def step(self, actions):
+        observations, rewards, dones, infos = self.venv.step(actions)
+        states = np.asarray(observations, dtype=np.int64)
+        if dones.any():
+            states = states.copy()
+            for i in np.flatnonzero(dones):
+                states[i] = infos[i]["terminal_observation"]
+        bonus = self.scale / np.sqrt(self.counts.update(states))
+        if self.add_to_reward:
+            rewards = rewards + bonus
+        else:
+            for info, b in zip(infos, bonus):
+                info["count_bonus"] = b
+        return observations, rewards, dones, infos
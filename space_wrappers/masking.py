@@ -0,0 +1,100 @@
+# action masks for flattened discrete spaces
+import numpy as np
+from .classify import num_discrete_actions
+
+__all__ = ["flat_mask", "masked_argmax", "masked_sample"]
+
+
+# `transform.flatten()` maps a MultiDiscrete or MultiBinary space to a single Discrete space, in
+# which the flat index enumerates the multi indices in row-major order. The functions in this
+# file take per-dimension masks for the original space, i.e. one boolean array of length `n_i`
+# for every dimension `i` (or, for a batch of envs, of shape `(batch, n_i)`), and combine them
+# into masks, masked argmax and masked samples over the flat indices.
+# A flat index is valid if the values of all its dimensions are valid.
+
+
+def _batch_masks(space, masks):
+    dims = num_discrete_actions(space)
+    if len(masks) != len(dims):
+        raise ValueError("Expected {} masks for space {}, got {}".format(len(dims), space, len(masks)))
+    masks = [np.asarray(m, dtype=bool) for m in masks]
+    single = masks[0].ndim == 1
+    masks = [np.atleast_2d(m) for m in masks]
+    for m, n in zip(masks, dims):
+        if m.shape[1] != n:
+            raise ValueError("Mask of shape {} does not match dimension of size {}".format(m.shape, n))
+    return dims, masks, single
+
+
+def flat_mask(space, masks):
+    """
+    Computes the mask over the flat indices of `flatten(space)` as the outer
+    product of the per-dimension `masks`, using one broadcast operation per
+    dimension.
+    :param gym.Space space: The MultiDiscrete or MultiBinary space.
+    :param masks: List of per-dimension masks, each of shape `(n_i,)` or `(batch, n_i)`.
+    :return np.ndarray: Boolean mask of shape `(N,)` or `(batch, N)`, where `N` is the
+        number of flat indices.
+    """
+    dims, masks, single = _batch_masks(space, masks)
+    batch = masks[0].shape[0]
+    result = np.ones((batch, 1), dtype=bool)
+    for m in masks:
+        result = (result[:, :, None] & m[:, None, :]).reshape(batch, -1)
+    return result[0] if single else result
+
+
+def masked_argmax(space, values, masks):
+    """
+    Finds the valid flat index with the largest value. Only the entries of
+    `values` that are valid are inspected, which are gathered with one
+    (open mesh) index operation per batch entry, so the flat mask is never
+    materialized.
+    :param gym.Space space: The MultiDiscrete or MultiBinary space.
+    :param np.ndarray values: Values for all flat indices, of shape `(N,)` or `(batch, N)`.
+    :param masks: List of per-dimension masks, each of shape `(n_i,)` or `(batch, n_i)`.
+    :return: The flat index, or an array of shape `(batch,)` of flat indices.
+    :raises ValueError: If no valid index exists.
+    """
+    dims, masks, single = _batch_masks(space, masks)
+    values = np.asarray(values)
+    values = np.reshape(values, (-1,) + dims)
+    result = np.zeros(len(values), dtype=np.int64)
+    for b in range(len(values)):
+        valid = [np.flatnonzero(m[b]) for m in masks]
+        if any(len(v) == 0 for v in valid):
+            raise ValueError("No valid action for batch entry {}".format(b))
+        candidates = values[b][np.ix_(*valid)]
+        best = np.unravel_index(np.argmax(candidates), candidates.shape)
+        result[b] = np.ravel_multi_index(tuple(v[i] for v, i in zip(valid, best)), dims)
+    return result[0] if single else result
+
+
+def masked_sample(space, masks, random_state=None):
+    """
+    Samples uniformly from the valid flat indices. Since the set of valid
+    indices is a product set, this is done by sampling each dimension
+    independently from its valid values, for the whole batch at once.
+    :param gym.Space space: The MultiDiscrete or MultiBinary space.
+    :param masks: List of per-dimension masks, each of shape `(n_i,)` or `(batch, n_i)`.
+    :param random_state: A `np.random.Generator` or `np.random.RandomState`.
+    :return: The flat index, or an array of shape `(batch,)` of flat indices.
+    :raises ValueError: If no valid index exists.
+    """
+    if random_state is None:
+        random_state = np.random
+    dims, masks, single = _batch_masks(space, masks)
+    batch = masks[0].shape[0]
+
+    choices = []
+    for m in masks:
+        counts = np.cumsum(m, axis=1)
+        total = counts[:, -1]
+        if (total == 0).any():
+            raise ValueError("No valid action for batch entries {}".format(np.flatnonzero(total == 0)))
+        # pick the k-th valid value, where k is uniform in [0, total)
+        k = np.floor(random_state.uniform(size=batch) * total).astype(np.int64)
+        choices.append(np.argmax(counts > k[:, None], axis=1))
+
+    result = np.ravel_multi_index(tuple(choices), dims)
+    return result[0] if single else result
@@ -3,7 +3,13 @@ from gym import Wrapper, ActionWrapper
 from gym import spaces
 from collections import deque
 import numpy as np
+from .classify import space_info, num_discrete_actions
+from .transform import flatten, rescale, one_hot, batched
+from .vector import VectorWrapper, _read, _copy
 
+__all__ = ["RepeatActionWrapper", "StackObservationWrapper", "ObserveLastActionWrapper",
+           "VectorObserveLastActionWrapper", "ToScalarActionWrapper", "ContinuingEnvWrapper",
+           "VectorContinuingEnvWrapper", "MetricsRingBuffer", "EPISODE_METRICS"]
 
 # In this file there are useful wrappers that are not, strictly speaking, (only) space wrappers, but
 # do perform some additional work.
@@ -35,11 +41,14 @@ class RepeatActionWrapper(Wrapper):
             obs, reward, done, info = self.env.step(action)
             total_reward += reward
             current_step += 1
+        return obs, total_reward, done, self._add_step_count(info)
+
+    def _add_step_count(self, info):
         if 'skip.stepcount' in info:
             raise gym.error.Error('Key "skip.stepcount" already in info. Make sure you are not stacking '
                                   'the SkipWrapper wrappers.')
         info['skip.stepcount'] = self._step_count
-        return obs, total_reward, done, info
+        return info
 
     def _reset(self):
         self._step_count = 0
@@ -71,44 +80,202 @@ class StackObservationWrapper(Wrapper):
 
     def step(self, action):
         obs, rew, done, info = self.env.step(action)
-        self._observations.append(obs)
-
-        return np.stack(self._observations, axis=self._axis), rew, done, info
+        return self._push(obs), rew, done, info
 
     def reset(self):
-        obs = self.env.reset()
+        return self._fill(self.env.reset())
+
+    def _push(self, obs):
+        self._observations.append(obs)
+        return np.stack(self._observations, axis=self._axis)
+
+    def _fill(self, obs):
         for i in range(self._observations.maxlen):
             self._observations.append(obs)
-
         return np.stack(self._observations, axis=self._axis)
 
 
+class _FlatEncoding(object):
+    # writes values of `space` as a flat vector into (a slice of) an array. Discrete spaces are
+    # one-hot encoded (per dimension for `MultiDiscrete` and `MultiBinary`, so that the size is the
+    # sum, not the product, of the dimensions), others flattened and, if `rescaled`, mapped to [-1, 1].
+    def __init__(self, space, rescaled):
+        self._flat = None
+        self._one_hot = None
+        self._scale = None
+        self._offsets = None
+        if isinstance(space, (spaces.MultiDiscrete, spaces.MultiBinary)):
+            dims = np.asarray(num_discrete_actions(space), dtype=np.int64)
+            self._offsets = np.concatenate([[0], np.cumsum(dims)[:-1]])
+            size = int(dims.sum())
+            self.low, self.high = np.zeros(size), np.ones(size)
+        elif isinstance(space, spaces.Discrete):
+            self._one_hot = one_hot(space, sparse=False).convert_to
+            self.low, self.high = np.zeros(space.n), np.ones(space.n)
+        else:
+            trafo = flatten(space)
+            self._flat = trafo.convert_to
+            target = trafo.target
+            if rescaled and space_info(target).bounded:
+                trafo = rescale(target, -1.0, 1.0)
+                self._scale = trafo.convert_to
+                target = trafo.target
+            self.low, self.high = target.low, target.high
+        self.size = len(self.low)
+
+    def __call__(self, x, out):
+        if self._offsets is not None:
+            out.fill(0)
+            out[self._offsets + np.ravel(x)] = 1
+        elif self._one_hot is not None:
+            self._one_hot(x, out=out)
+        else:
+            x = self._flat(x)
+            out[...] = x if self._scale is None else self._scale(x)
+
+    def batch(self, x, out):
+        if self._offsets is not None:
+            x = np.reshape(x, (len(x), -1))
+            out.fill(0)
+            out[np.arange(len(x))[:, None], self._offsets + x] = 1
+        elif self._one_hot is not None:
+            self._one_hot.batch(x, out=out)
+        else:
+            x = batched(self._flat)(x)
+            out[...] = x if self._scale is None else batched(self._scale)(x)
+
+
+class _LastActionLayout(object):
+    # observation and last action side by side in a flat float32 vector.
+    def __init__(self, observation_space, action_space, default_action):
+        self.observation = _FlatEncoding(observation_space, rescaled=False)
+        self.action = _FlatEncoding(action_space, rescaled=True)
+        self.split = self.observation.size
+        low = np.concatenate([self.observation.low, self.action.low])
+        high = np.concatenate([self.observation.high, self.action.high])
+        self.space = spaces.Box(low.astype(np.float32), high.astype(np.float32), dtype=np.float32)
+        # encoded default action; all zeros if there is none
+        self.default = np.zeros(self.action.size, dtype=np.float32)
+        if default_action is not None:
+            self.action(default_action, out=self.default)
+
+
 class ObserveLastActionWrapper(Wrapper):
     """
     This wrapper changes an environment with observation space S and
     action space A into one with observation space Tuple(S, A), by including
     the most recent action in the state space.
+    If `flat` is set, the observation space is instead a flat float32 `Box`,
+    containing the flattened observation followed by the last action, one-hot
+    encoded if it is discrete (per dimension for `MultiDiscrete` and
+    `MultiBinary`), or rescaled to [-1, 1] if it is a bounded `Box`.
+    Both are written directly into a preallocated array (which is reused for
+    every observation if `reuse_buffer` is set, see
+    `DownsampledObservationWrapper`).
     """
-    def __init__(self, env, default_action=None):
+    def __init__(self, env, default_action=None, flat=False, reuse_buffer=False):
         """
         :param gym.Env env: The environment to wrap.
-        :param int default_action: The action to use after a reset.
+        :param int default_action: The action to use after a reset. In flat mode, if there is no default action,
+            the action part of the observation is all zeros after a reset.
+        :param bool flat: Whether to produce flat array observations.
+        :param bool reuse_buffer: Whether to write all flat observations into the same array.
         """
         super(ObserveLastActionWrapper, self).__init__(env)
         if default_action is None and isinstance(env.action_space, gym.spaces.Box):
             default_action = np.zeros_like(env.action_space.low)
 
         self._default_action = default_action
-        self.observation_space = gym.spaces.Tuple((env.observation_space, env.action_space))
+        self._layout = None
+        self._buffer = None
+        if flat:
+            self._layout = _LastActionLayout(env.observation_space, env.action_space, default_action)
+            self.observation_space = self._layout.space
+            if reuse_buffer:
+                self._buffer = np.zeros(self.observation_space.shape, dtype=np.float32)
+        else:
+            self.observation_space = gym.spaces.Tuple((env.observation_space, env.action_space))
 
     def step(self, action):
         obs, rew, done, info = self.env.step(action)
 
-        return (obs, action), rew, done, info
+        return self._observe(obs, action), rew, done, info
 
     def reset(self):
         obs = self.env.reset()
-        return obs, self._default_action
+        return self._observe(obs, self._default_action)
+
+    def _observe(self, obs, action):
+        layout = self._layout
+        if layout is None:
+            return obs, action
+
+        out = self._buffer
+        if out is None:
+            out = np.empty(self.observation_space.shape, dtype=np.float32)
+        layout.observation(obs, out=out[:layout.split])
+        if action is None:
+            out[layout.split:] = layout.default
+        else:
+            layout.action(action, out=out[layout.split:])
+        return out
+
+
+class VectorObserveLastActionWrapper(VectorWrapper):
+    """
+    Vector env version of `ObserveLastActionWrapper` in flat mode.
+    The observations and actions of all sub-envs are encoded into one
+    `(num_envs, size)` array with one batch conversion each. Sub-envs that
+    have been reset observe the default action, and their
+    `info["terminal_observation"]` is encoded with the action that ended
+    the episode.
+    """
+    def __init__(self, venv, default_action=None, reuse_buffer=False):
+        """
+        :param VectorEnv venv: The vector env to wrap.
+        :param default_action: The action to use after a reset.
+        :param bool reuse_buffer: Whether to write all batches of observations into the same array.
+        """
+        super(VectorObserveLastActionWrapper, self).__init__(venv)
+        if default_action is None and isinstance(venv.action_space, gym.spaces.Box):
+            default_action = np.zeros_like(venv.action_space.low)
+        self._layout = _LastActionLayout(venv.observation_space, venv.action_space, default_action)
+        self.observation_space = self._layout.space
+        # encoded last actions, needed for the sub-envs that are not reset by a masked reset
+        self._actions = np.zeros((self.num_envs, self._layout.action.size), dtype=np.float32)
+        self._buffer = None
+        if reuse_buffer:
+            self._buffer = self._allocate()
+
+    def _allocate(self):
+        return np.empty((self.num_envs,) + self.observation_space.shape, dtype=np.float32)
+
+    def reset(self, mask=None):
+        out = self._buffer if self._buffer is not None else self._allocate()
+        layout = self._layout
+        layout.observation.batch(self.venv.reset(mask), out=out[:, :layout.split])
+        if mask is None:
+            self._actions[:] = layout.default
+        else:
+            self._actions[np.asarray(mask, dtype=bool)] = layout.default
+        out[:, layout.split:] = self._actions
+        return out
+
+    def step(self, actions):
+        observations, rewards, dones, infos = self.venv.step(actions)
+        out = self._buffer if self._buffer is not None else self._allocate()
+        layout = self._layout
+        layout.observation.batch(observations, out=out[:, :layout.split])
+        layout.action.batch(actions, out=self._actions)
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                terminal = np.empty(self.observation_space.shape, dtype=np.float32)
+                layout.observation(infos[i]["terminal_observation"], out=terminal[:layout.split])
+                terminal[layout.split:] = self._actions[i]
+                infos[i]["terminal_observation"] = terminal
+            self._actions[dones] = layout.default
+        out[:, layout.split:] = self._actions
+        return out, rewards, dones, infos
 
 
 class ToScalarActionWrapper(ActionWrapper):
@@ -140,6 +307,45 @@ class ToScalarActionWrapper(ActionWrapper):
         return action
 
 
+# Episode statistics of `ContinuingEnvWrapper` and `VectorContinuingEnvWrapper` are passed to a metrics
+# sink, a callable that receives a structured array with one record per finished episode, at most
+# once per step.
+EPISODE_METRICS = np.dtype([("env", np.int64), ("total_reward", np.float64), ("reward_rate", np.float64),
+                            ("final_reward", np.float64)])
+
+
+class MetricsRingBuffer(object):
+    """
+    A metrics sink that keeps the most recent `capacity` records in a
+    preallocated array, without any I/O, so that they can be inspected
+    or logged outside of the step loop.
+    """
+    def __init__(self, capacity, dtype=EPISODE_METRICS):
+        """
+        :param int capacity: The number of records to keep.
+        :param dtype: The structured dtype of the records.
+        """
+        self._data = np.zeros(capacity, dtype=dtype)
+        self.count = 0
+
+    def __call__(self, records):
+        capacity = len(self._data)
+        if len(records) > capacity:
+            self.count += len(records) - capacity
+            records = records[-capacity:]
+        self._data[(self.count + np.arange(len(records))) % capacity] = records
+        self.count += len(records)
+
+    def records(self):
+        """
+        :return np.ndarray: The kept records, oldest first.
+        """
+        capacity = len(self._data)
+        if self.count <= capacity:
+            return self._data[:self.count].copy()
+        return np.roll(self._data, -(self.count % capacity))
+
+
 class ContinuingEnvWrapper(Wrapper):
     """
     Converts the reward signal of terminal episodes to
@@ -151,26 +357,101 @@ class ContinuingEnvWrapper(Wrapper):
     reward that would be produced if the episode were
     to continue with a constant reward rate.
     """
-    def __init__(self, env, gamma, duration):
+    def __init__(self, env, gamma, duration, metrics=None):
+        """
+        :param gym.Env env: The environment to wrap.
+        :param float gamma: The discount factor.
+        :param int duration: The number of steps after which the episode is terminated.
+        :param metrics: Sink for the statistics of each terminated episode (see `MetricsRingBuffer`).
+        """
         super(ContinuingEnvWrapper, self).__init__(env)
         self._gamma = gamma
         self._duration = duration
+        self._metrics = metrics
         self._count = 0
         self._reward = 0
 
-    def _reset(self):
+    def reset(self, **kwargs):
+        self._reset_counters()
+        return self.env.reset(**kwargs)
+
+    def _reset_counters(self):
         self._count = 0
         self._reward = 0
-        return self.env.reset()
 
-    def _step(self, action):
+    def step(self, action):
         obs, reward, done, info = self.env.step(action)
+        reward, done = self._continue(reward, done)
+        return obs, reward, done, info
+
+    def _continue(self, reward, done):
         self._count += 1
         self._reward += reward
         if self._count == self._duration:
             reward_rate = self._reward / self._duration
-            reward = reward_rate / (1 - self._gamma)
-            print("RR", self._reward, reward)
-            done = True
+            final_reward = reward_rate / (1 - self._gamma)
+            if self._metrics is not None:
+                self._metrics(np.array([(0, self._reward, reward_rate, final_reward)], dtype=EPISODE_METRICS))
+            return final_reward, True
+        return reward, done
 
-        return obs, reward, done, info
+
+class VectorContinuingEnvWrapper(VectorWrapper):
+    """
+    Vector env version of `ContinuingEnvWrapper`. The step counters and
+    reward sums of all sub-envs are kept in arrays and updated with one
+    vectorized operation per step. Like sub-envs whose episode ends on
+    its own, sub-envs whose episode is terminated by this wrapper are
+    reset (with a single masked `reset` of the wrapped vector env), and
+    their last observation is available as `info["terminal_observation"]`.
+    """
+    def __init__(self, venv, gamma, duration, metrics=None):
+        """
+        :param VectorEnv venv: The vector env to wrap.
+        :param float gamma: The discount factor.
+        :param int duration: The number of steps after which an episode is terminated.
+        :param metrics: Sink for the statistics of terminated episodes (see `MetricsRingBuffer`).
+        """
+        super(VectorContinuingEnvWrapper, self).__init__(venv)
+        self._gamma = gamma
+        self._duration = duration
+        self._metrics = metrics
+        self._count = np.zeros(self.num_envs, dtype=np.int64)
+        self._reward = np.zeros(self.num_envs, dtype=np.float64)
+
+    def reset(self, mask=None):
+        reset = slice(None) if mask is None else np.asarray(mask, dtype=bool)
+        self._count[reset] = 0
+        self._reward[reset] = 0
+        return self.venv.reset(mask)
+
+    def step(self, actions):
+        observations, rewards, dones, infos = self.venv.step(actions)
+        self._count += 1
+        self._reward += rewards
+        ended = self._count == self._duration
+        if ended.any():
+            envs = np.flatnonzero(ended)
+            reward_rate = self._reward[envs] / self._duration
+            final_reward = reward_rate / (1 - self._gamma)
+            rewards = np.array(rewards, dtype=np.float64)
+            rewards[envs] = final_reward
+            if self._metrics is not None:
+                records = np.zeros(len(envs), dtype=EPISODE_METRICS)
+                records["env"] = envs
+                records["total_reward"] = self._reward[envs]
+                records["reward_rate"] = reward_rate
+                records["final_reward"] = final_reward
+                self._metrics(records)
+
+            # sub-envs that have not already been reset by the wrapped vector env
+            reset = ended & ~dones
+            if reset.any():
+                for i in np.flatnonzero(reset):
+                    infos[i]["terminal_observation"] = _copy(_read(observations, i))
+                observations = self.venv.reset(reset)
+            dones = dones | ended
+
+        self._count[dones] = 0
+        self._reward[dones] = 0
+        return observations, rewards, dones, infos
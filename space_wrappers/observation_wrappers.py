@@ -1,5 +1,16 @@
 from gym import ObservationWrapper
-from .transform import *
+import numpy as np
+from .transform import flatten, discretize, rescale, quantize, downsample, one_hot, validated, ValidationStats, \
+    SparseOneHotSpace
+from .adaptive import adaptive_discretize
+
+__all__ = ["FlattenedObservationWrapper", "DiscretizedObservationWrapper", "RescaledObservationWrapper",
+           "QuantizedObservationWrapper", "DownsampledObservationWrapper", "AdaptiveDiscretizedObservationWrapper",
+           "OneHotObservationWrapper"]
+
+# Except for `AdaptiveDiscretizedObservationWrapper`, the wrappers in this file accept `validate`,
+# the fraction of observations that are checked to lie in the new observation space (see
+# `transform.validated()`). The violation counters are available as `validation`.
 
 
 class FlattenedObservationWrapper(ObservationWrapper):
@@ -7,9 +18,11 @@ class FlattenedObservationWrapper(ObservationWrapper):
     Wraps the env such that the new env has a flattened
     observation space.
     """
-    def __init__(self, env):
+    def __init__(self, env, validate=0.0):
         super(FlattenedObservationWrapper, self).__init__(env)
         trafo = flatten(env.observation_space)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.observation_space = trafo.target
         self.observation = trafo.convert_to
 
@@ -19,9 +32,11 @@ class DiscretizedObservationWrapper(ObservationWrapper):
     Wraps the env such that the new env has a discrete
     observation space.
     """
-    def __init__(self, env, steps):
+    def __init__(self, env, steps, validate=0.0):
         super(DiscretizedObservationWrapper, self).__init__(env)
         trafo = discretize(env.observation_space, steps)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.observation_space = trafo.target
         self.observation = trafo.convert_to
 
@@ -31,8 +46,120 @@ class RescaledObservationWrapper(ObservationWrapper):
     Wraps the env such that the new env has a rescaled
     observation space.
     """
-    def __init__(self, env, low, high):
+    def __init__(self, env, low, high, validate=0.0):
         super(RescaledObservationWrapper, self).__init__(env)
         trafo = rescale(env.observation_space, low=low, high=high)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
         self.observation_space = trafo.target
         self.observation = trafo.convert_to
+
+
+class QuantizedObservationWrapper(ObservationWrapper):
+    """
+    Wraps the env such that the new env has an observation
+    space of small unsigned integers (see `transform.quantize()`).
+    This reduces the memory needed to store observations, e.g.
+    in an experience replay, by a factor of 2 to 8. The learner
+    can recover (approximate) original observations with
+    `dequantize`, which also accepts whole batches.
+    """
+    def __init__(self, env, dtype=np.uint8, validate=0.0):
+        super(QuantizedObservationWrapper, self).__init__(env)
+        trafo = quantize(env.observation_space, dtype=dtype)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
+        self.observation_space = trafo.target
+        self.observation = trafo.convert_to
+        self.dequantize = trafo.convert_from
+
+
+class DownsampledObservationWrapper(ObservationWrapper):
+    """
+    Wraps the env such that image observations are reduced in size
+    by pooling over blocks of pixels, and optionally converted to
+    grayscale (see `transform.downsample()`). Applying this before
+    e.g. `StackObservationWrapper` makes stacking and storing the
+    observations proportionally cheaper; the observations keep the
+    dtype of the env unless `dtype` is given.
+    If `reuse_buffer` is set, all observations are written into the
+    same preallocated array, which is only safe if the consumer does
+    not keep references to previous observations (as
+    `StackObservationWrapper` does).
+    """
+    def __init__(self, env, factor, mode="mean", grayscale=False, reuse_buffer=False, validate=0.0, dtype=None):
+        super(DownsampledObservationWrapper, self).__init__(env)
+        trafo = downsample(env.observation_space, factor, mode=mode, grayscale=grayscale, dtype=dtype)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
+        self.observation_space = trafo.target
+        self._pool = trafo.convert_to
+        self._buffer = None
+        if reuse_buffer:
+            self._buffer = np.empty(trafo.target.shape, dtype=trafo.target.dtype)
+
+    def observation(self, observation):
+        return self._pool(observation, out=self._buffer)
+
+
+class OneHotObservationWrapper(ObservationWrapper):
+    """
+    Wraps the env such that `Discrete` observations are one-hot
+    encoded (see `transform.one_hot()`). For large spaces, the
+    observations are `SparseOneHot` index arrays instead of dense
+    vectors, and the observation space is a `SparseOneHotSpace`.
+    For vector envs, pass `transform.one_hot()` as the
+    `observation_transform` of `ThreadedVectorEnv` to encode whole
+    batches at once.
+    If `reuse_buffer` is set, dense observations are all written
+    into the same preallocated array (see
+    `DownsampledObservationWrapper`).
+    The length of the encoding can be set with `n`, e.g. to the
+    `max_cells` of an `AdaptiveDiscretizedObservationWrapper`.
+    """
+    def __init__(self, env, sparse=None, dtype=np.float32, max_dense=4096, reuse_buffer=False, validate=0.0, n=None):
+        super(OneHotObservationWrapper, self).__init__(env)
+        trafo = one_hot(env.observation_space, sparse=sparse, dtype=dtype, max_dense=max_dense, n=n)
+        self.validation = ValidationStats()
+        trafo = validated(trafo, validate, self.validation)
+        if sparse is None:
+            sparse = isinstance(trafo.target, SparseOneHotSpace)
+        self.observation_space = trafo.target
+        self._encode = trafo.convert_to
+        self._buffer = None
+        if reuse_buffer and not sparse:
+            self._buffer = np.zeros(trafo.target.shape, dtype=trafo.target.dtype)
+
+    def observation(self, observation):
+        if self._buffer is None:
+            return self._encode(observation)
+        return self._encode(observation, out=self._buffer)
+
+
+class AdaptiveDiscretizedObservationWrapper(ObservationWrapper):
+    """
+    Wraps the env such that the new env has a discrete observation
+    space whose cells are refined where the env spends most of its
+    time (see `adaptive.adaptive_discretize()`). The observation space
+    grows as cells are split, up to `max_cells`. Refinement can be
+    stopped by setting `refine` to False, e.g. for evaluation; for
+    value-driven splitting, disable it and call `partition.update`
+    with batches of observations and values instead.
+    Note that `observation_space.n` is changed in place. Anything that
+    is sized from it when it is built only covers the cells that existed
+    at that time, and fails once a cell with a larger id is observed.
+    Size these with `max_cells` instead, e.g. by passing `n=max_cells`
+    to `CountBonusWrapper` or `OneHotObservationWrapper`.
+    """
+    def __init__(self, env, max_cells, split_count=100, split_variance=None, refine=True):
+        super(AdaptiveDiscretizedObservationWrapper, self).__init__(env)
+        trafo = adaptive_discretize(env.observation_space, max_cells, split_count=split_count,
+                                    split_variance=split_variance)
+        self.observation_space = trafo.target
+        self.partition = trafo.convert_to
+        self.refine = refine
+
+    def observation(self, observation):
+        if self.refine:
+            return int(self.partition.update(np.asarray(observation)[None])[0])
+        return self.partition(observation)
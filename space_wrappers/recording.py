@@ -0,0 +1,298 @@
+import json
+import os
+import pickle
+import queue
+import threading
+import numpy as np
+import gym
+from gym import Wrapper, spaces
+from .transform import flatten
+
+__all__ = ["RecordingWrapper", "Recording", "ReplayEnv"]
+
+
+# In this file are wrappers that record the interaction with an environment to disk, and
+# functions to read these recordings back.
+#
+# A recording is a directory containing one set of `.npy` files per chunk, one file for each
+# of the fields `observation`, `action`, `reward`, `done` and `episode`, a `meta.json` file
+# with the number of valid entries in each chunk and a `spaces.pkl` with the original spaces.
+# Observations and actions are stored in the layout produced by `transform.flatten()`: a
+# single integer for discrete spaces, a vector for everything else.
+# Each row corresponds to one value returned by the env: row `i` contains the observation
+# returned by a call to `reset` or `step`, the (flattened) action that was passed to `step`,
+# and the resulting reward and done flag. Rows produced by `reset` start a new episode, and
+# contain a zero action and reward.
+
+FIELDS = ("observation", "action", "reward", "done", "episode")
+
+
+def _flat_layout(space):
+    """ Returns the transform to the flat storage layout, and the shape and dtype of a single entry. """
+    trafo = flatten(space)
+    if isinstance(trafo.target, spaces.Discrete):
+        return trafo, (), np.dtype(np.int64)
+    return trafo, trafo.target.shape, trafo.target.dtype
+
+
+def _chunk_path(directory, field, chunk):
+    return os.path.join(directory, "{}_{:05d}.npy".format(field, chunk))
+
+
+class _Block(object):
+    def __init__(self, layout, size):
+        self.arrays = {name: np.zeros((size,) + shape, dtype=dtype) for name, (shape, dtype) in layout.items()}
+        self.count = 0
+
+
+class RecordingWrapper(Wrapper):
+    """
+    Records all transitions of the wrapped env into a directory of
+    memory-mapped `.npy` files (see the comment at the top of `recording.py`
+    for the layout). Transitions are collected into in-memory blocks of
+    `block_size` rows, and full blocks are written by a background thread
+    into preallocated chunk files of `chunk_size` rows each, so that the
+    `step` path only copies the new values into the current block.
+    The recording is completed by calling `close`.
+    """
+    def __init__(self, env, directory, chunk_size=65536, block_size=1024):
+        """
+        :param gym.Env env: The environment to wrap.
+        :param str directory: The directory into which the recording is written. Will be created
+            if it does not exist.
+        :param int chunk_size: Number of rows per chunk file.
+        :param int block_size: Number of rows that are handed to the writer thread at once. Needs
+            to divide `chunk_size`.
+        """
+        super(RecordingWrapper, self).__init__(env)
+        if chunk_size % block_size != 0:
+            raise ValueError("block_size {} does not divide chunk_size {}".format(block_size, chunk_size))
+
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._obs_trafo, obs_shape, obs_dtype = _flat_layout(env.observation_space)
+        self._act_trafo, act_shape, act_dtype = _flat_layout(env.action_space)
+        self._layout = {"observation": (obs_shape, obs_dtype), "action": (act_shape, act_dtype),
+                        "reward": ((), np.dtype(np.float64)), "done": ((), np.dtype(np.bool_)),
+                        "episode": ((), np.dtype(np.int64))}
+        self._zero_action = np.zeros(act_shape, dtype=act_dtype)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, "spaces.pkl"), "wb") as f:
+            pickle.dump((env.observation_space, env.action_space), f)
+
+        # two blocks suffice to decouple the step path from the writer, a third one absorbs jitter.
+        self._free = queue.Queue()
+        for i in range(3):
+            self._free.put(_Block(self._layout, block_size))
+        self._block = self._free.get()
+        self._pending = queue.Queue()
+        self._lengths = []
+        self._error = None
+        self._episode = -1
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_blocks)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self._record_reset(obs)
+        return obs
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        self._record_step(obs, action, reward, done)
+        return obs, reward, done, info
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self._block.count > 0:
+                self._pending.put(self._block)
+            self._pending.put(None)
+            self._writer.join()
+            with open(os.path.join(self._directory, "meta.json"), "w") as f:
+                json.dump({"chunk_size": self._chunk_size, "lengths": self._lengths}, f)
+            self._raise_writer_error()
+        return self.env.close()
+
+    def _record_reset(self, obs):
+        self._episode += 1
+        self._record(obs, self._zero_action, 0.0, False)
+
+    def _record_step(self, obs, action, reward, done):
+        self._record(obs, self._act_trafo.convert_to(action), reward, done)
+
+    def _record(self, obs, action, reward, done):
+        block = self._block
+        i = block.count
+        arrays = block.arrays
+        arrays["observation"][i] = self._obs_trafo.convert_to(obs)
+        arrays["action"][i] = action
+        arrays["reward"][i] = reward
+        arrays["done"][i] = done
+        arrays["episode"][i] = self._episode
+        block.count = i + 1
+        if block.count == len(arrays["reward"]):
+            self._raise_writer_error()
+            self._pending.put(block)
+            self._block = self._free.get()
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            raise IOError("Writing the recording to {} failed: {}".format(self._directory, self._error))
+
+    def _open_chunk(self, chunk):
+        return {name: np.lib.format.open_memmap(_chunk_path(self._directory, name, chunk), mode="w+",
+                                                dtype=dtype, shape=(self._chunk_size,) + shape)
+                for name, (shape, dtype) in self._layout.items()}
+
+    def _write_blocks(self):
+        files = None
+        position = 0
+        while True:
+            block = self._pending.get()
+            if block is None:
+                break
+            try:
+                if files is None:
+                    files = self._open_chunk(len(self._lengths))
+                    self._lengths.append(0)
+                n = block.count
+                for name, data in block.arrays.items():
+                    files[name][position:position+n] = data[:n]
+                position += n
+                self._lengths[-1] = position
+                if position == self._chunk_size:
+                    for f in files.values():
+                        f.flush()
+                    files = None
+                    position = 0
+            except Exception as e:  # pragma: no cover
+                self._error = e
+            block.count = 0
+            self._free.put(block)
+
+        if files is not None:
+            for f in files.values():
+                f.flush()
+
+
+class Recording(object):
+    """
+    Read-only view of a recording produced by `RecordingWrapper`. The data
+    of each field is available as a list of memory-mapped arrays, one per
+    chunk, so reading it does not copy anything into memory.
+    """
+    def __init__(self, directory):
+        """
+        :param str directory: The directory containing the recording.
+        """
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, "spaces.pkl"), "rb") as f:
+            self.observation_space, self.action_space = pickle.load(f)
+
+        self.lengths = meta["lengths"]
+        self.chunks = {name: [np.load(_chunk_path(directory, name, c), mmap_mode="r")[:n]
+                              for c, n in enumerate(self.lengths)]
+                       for name in FIELDS}
+
+    def __len__(self):
+        return sum(self.lengths)
+
+    @property
+    def observations(self):
+        return self.chunks["observation"]
+
+    @property
+    def actions(self):
+        return self.chunks["action"]
+
+    @property
+    def rewards(self):
+        return self.chunks["reward"]
+
+    @property
+    def dones(self):
+        return self.chunks["done"]
+
+    @property
+    def episodes(self):
+        return self.chunks["episode"]
+
+
+class ReplayEnv(gym.Env):
+    """
+    An environment that replays the episodes of a recording made by
+    `RecordingWrapper`, in the order in which they were recorded (starting
+    again from the first one after the last episode). It has the original
+    observation and action spaces, so the wrappers of this package can be
+    applied to it as to the recorded env. Since observations are returned as
+    read-only views into the memory-mapped recording, this allows profiling
+    wrapper stacks and agents in isolation from the cost of the simulator.
+    The actions passed to `step` are ignored, unless `check_actions` is set.
+    """
+    def __init__(self, recording, check_actions=False):
+        """
+        :param Recording|str recording: The recording, or the directory containing it.
+        :param bool check_actions: If set, `step` raises an error if the given action differs
+            from the recorded one. This allows deterministic regression tests of agents.
+        """
+        super(ReplayEnv, self).__init__()
+        if not isinstance(recording, Recording):
+            recording = Recording(recording)
+        if len(recording) == 0:
+            raise ValueError("Cannot replay an empty recording")
+
+        self.observation_space = recording.observation_space
+        self.action_space = recording.action_space
+        self._obs_from = flatten(self.observation_space).convert_from
+        self._act_to = flatten(self.action_space).convert_to
+        self._check_actions = check_actions
+        self._observations = recording.observations
+        self._actions = recording.actions
+        self._rewards = recording.rewards
+        self._dones = recording.dones
+        self._episodes = recording.episodes
+
+        # (chunk, row) of the first row of each episode
+        self._starts = []
+        previous = None
+        for c, episodes in enumerate(self._episodes):
+            changes = np.flatnonzero(np.diff(episodes, prepend=-1 if previous is None else previous))
+            self._starts += [(c, int(r)) for r in changes]
+            if len(episodes) > 0:
+                previous = episodes[-1]
+
+        self._next_episode = 0
+        self._chunk = None
+        self._row = None
+        self._done = True
+
+    def reset(self):
+        self._chunk, self._row = self._starts[self._next_episode]
+        self._next_episode = (self._next_episode + 1) % len(self._starts)
+        self._done = False
+        return self._obs_from(self._observations[self._chunk][self._row])
+
+    def step(self, action):
+        if self._done:
+            raise gym.error.ResetNeeded("Cannot step a ReplayEnv after the end of the recorded episode.")
+
+        episode = self._episodes[self._chunk][self._row]
+        self._row += 1
+        if self._row == len(self._episodes[self._chunk]):
+            self._chunk += 1
+            self._row = 0
+        c, r = self._chunk, self._row
+        if c == len(self._episodes) or self._episodes[c][r] != episode:
+            raise gym.error.Error("The recorded episode ended without a terminal transition.")
+
+        if self._check_actions and np.any(self._act_to(action) != self._actions[c][r]):
+            raise gym.error.Error("Action {} does not match the recorded action".format(action))
+
+        self._done = bool(self._dones[c][r])
+        return self._obs_from(self._observations[c][r]), float(self._rewards[c][r]), self._done, {}
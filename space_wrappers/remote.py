@@ -0,0 +1,266 @@
+import os
+import socket
+import struct
+import gym
+from gym import spaces
+import numpy as np
+from .transform import flatten, batched
+from .vector import VectorEnv, _read
+
+__all__ = ["EnvServer", "RemoteEnv", "RemoteVectorEnv"]
+
+# In this file are a server that runs envs in a separate process (or machine), and clients that
+# present these envs as a normal or a vector env, to which the wrappers of this package can be
+# applied.
+#
+# Server and client communicate over a stream socket (a Unix domain socket if the address is a
+# path, TCP otherwise) with fixed-size frames of raw bytes; nothing is pickled. Observations and
+# actions are laid out as produced by `transform.flatten()`, i.e. as a single int64 for discrete
+# spaces and as a vector of the space's dtype for everything else; each frame contains the
+# values of all envs of the server.
+#  * After accepting a connection, the server sends a header with a magic number, the number
+#    of envs and the size and dtype of a single flat observation and action, which lets the
+#    client verify that both sides use the same spaces.
+#  * `b"R"` followed by one byte per env: resets the envs whose byte is non-zero. The reply
+#    contains the current observations of all envs.
+#  * `b"S"` followed by the actions of all envs: steps all envs. The reply contains the
+#    observations of all envs, followed by the float64 rewards and the uint8 done flags.
+#  * `b"C"`: ends the connection.
+# Info dicts are not transferred.
+
+_MAGIC = b"SWR1"
+_HEADER = struct.Struct("<4sIQQcc")
+
+
+class _FlatLayout(object):
+    """ Conversion of batches of values of `space` to and from flat arrays. """
+    def __init__(self, space, count):
+        trafo = flatten(space)
+        if isinstance(trafo.target, spaces.Discrete):
+            shape, dtype = (), np.dtype(np.int64)
+        else:
+            shape, dtype = trafo.target.shape, trafo.target.dtype
+        self.buffer = np.zeros((count,) + shape, dtype=dtype)
+        self.item_size = self.buffer[0].nbytes
+        self.type_code = dtype.char.encode("ascii")
+        self.to_flat = batched(trafo.convert_to)
+        self.from_flat = batched(trafo.convert_from)
+
+
+def _batch_of_one(value):
+    if isinstance(value, tuple):
+        return tuple(_batch_of_one(v) for v in value)
+    return np.asarray(value)[None]
+
+
+def _connect(address):
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(address)
+    if family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def _recv_into(sock, buffer):
+    view = memoryview(buffer).cast("B")
+    while len(view) > 0:
+        n = sock.recv_into(view)
+        if n == 0:
+            raise EOFError("Connection closed by peer")
+        view = view[n:]
+
+
+class EnvServer(object):
+    """
+    Serves a list of envs to a `RemoteVectorEnv` or `RemoteEnv` client.
+    """
+    def __init__(self, envs, address):
+        """
+        :param envs: The envs to serve. All need to have the same spaces.
+        :param address: Path of a Unix domain socket, or a `(host, port)` tuple for TCP. Port 0
+            picks a free port; the actual address is available as `address`.
+        """
+        self.envs = list(envs)
+        env = self.envs[0]
+        count = len(self.envs)
+        self._observations = _FlatLayout(env.observation_space, count)
+        self._actions = _FlatLayout(env.action_space, count)
+        self._last_obs = [None] * count
+        self._rewards = np.zeros(count, dtype=np.float64)
+        self._dones = np.zeros(count, dtype=np.uint8)
+        self._mask = np.zeros(count, dtype=np.uint8)
+        self._command = bytearray(1)
+
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(address)
+        self._socket.listen(1)
+        self.address = self._socket.getsockname()
+
+    def serve(self):
+        """
+        Accepts a single connection and serves it until the client disconnects.
+        """
+        connection, _ = self._socket.accept()
+        if connection.family == socket.AF_INET:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            connection.sendall(_HEADER.pack(_MAGIC, len(self.envs), self._observations.item_size,
+                                            self._actions.item_size, self._observations.type_code,
+                                            self._actions.type_code))
+            while self._handle(connection):
+                pass
+        except EOFError:
+            pass
+        finally:
+            connection.close()
+
+    def serve_forever(self):
+        while True:
+            self.serve()
+
+    def close(self):
+        self._socket.close()
+        if self._socket.family == socket.AF_UNIX:
+            # otherwise, the path cannot be bound again
+            os.unlink(self.address)
+        for env in self.envs:
+            env.close()
+
+    def _handle(self, connection):
+        _recv_into(connection, self._command)
+        command = bytes(self._command)
+        if command == b"R":
+            _recv_into(connection, self._mask)
+            for i in np.flatnonzero(self._mask):
+                self._last_obs[i] = self.envs[i].reset()
+            connection.sendall(self._flat_observations())
+        elif command == b"S":
+            _recv_into(connection, self._actions.buffer)
+            actions = self._actions.from_flat(self._actions.buffer)
+            for i, env in enumerate(self.envs):
+                self._last_obs[i], self._rewards[i], self._dones[i], _ = env.step(_read(actions, i))
+            connection.sendall(self._flat_observations())
+            connection.sendall(self._rewards)
+            connection.sendall(self._dones)
+        elif command == b"C":
+            return False
+        else:
+            raise ValueError("Unknown command {}".format(command))
+        return True
+
+    def _flat_observations(self):
+        for i, obs in enumerate(self._last_obs):
+            if obs is not None:
+                self._observations.buffer[i] = self._observations.to_flat(_batch_of_one(obs))[0]
+        return self._observations.buffer
+
+
+class _Client(object):
+    def __init__(self, address, observation_space, action_space):
+        self._socket = _connect(address)
+        header = bytearray(_HEADER.size)
+        _recv_into(self._socket, header)
+        magic, count, obs_size, act_size, obs_type, act_type = _HEADER.unpack(bytes(header))
+        if magic != _MAGIC:
+            self._socket.close()
+            raise IOError("Unexpected reply from server at {}".format(address))
+
+        self.num_envs = count
+        self.observations = _FlatLayout(observation_space, count)
+        self.actions = _FlatLayout(action_space, count)
+        expected = (self.observations.item_size, self.actions.item_size, self.observations.type_code,
+                    self.actions.type_code)
+        if (obs_size, act_size, obs_type, act_type) != expected:
+            self._socket.close()
+            raise ValueError("Spaces do not match those of the server at {}".format(address))
+        self.rewards = np.zeros(count, dtype=np.float64)
+        self.dones = np.zeros(count, dtype=np.uint8)
+
+    def reset(self, mask):
+        self._socket.sendall(b"R" + np.asarray(mask, dtype=np.uint8).tobytes())
+        _recv_into(self._socket, self.observations.buffer)
+
+    def step(self, actions):
+        flat = self.actions.to_flat(actions)
+        self._socket.sendall(b"S" + np.ascontiguousarray(flat, dtype=self.actions.buffer.dtype).tobytes())
+        _recv_into(self._socket, self.observations.buffer)
+        _recv_into(self._socket, self.rewards)
+        _recv_into(self._socket, self.dones)
+
+    def close(self):
+        self._socket.sendall(b"C")
+        self._socket.close()
+
+
+class RemoteVectorEnv(VectorEnv):
+    """
+    A vector env whose sub-envs are the envs of an `EnvServer`. All envs are
+    stepped with a single message. Since the spaces are not transferred, they
+    have to be given to the client, and have to match those of the server.
+    """
+    def __init__(self, address, observation_space, action_space):
+        """
+        :param address: Address of the server (see `EnvServer`).
+        :param gym.Space observation_space: The observation space of the served envs.
+        :param gym.Space action_space: The action space of the served envs.
+        """
+        self._client = _Client(address, observation_space, action_space)
+        self.num_envs = self._client.num_envs
+        self.observation_space = observation_space
+        self.action_space = action_space
+
+    def reset(self, mask=None):
+        self._client.reset(np.ones(self.num_envs, dtype=np.uint8) if mask is None else mask)
+        return self._client.observations.from_flat(self._client.observations.buffer.copy())
+
+    def step(self, actions):
+        client = self._client
+        client.step(actions)
+        observations = client.observations.buffer.copy()
+        dones = client.dones.astype(bool)
+        infos = [{} for i in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = _read(client.observations.from_flat(observations[i:i+1].copy()), 0)
+            client.reset(dones)
+            observations[dones] = client.observations.buffer[dones]
+        return client.observations.from_flat(observations), client.rewards.copy(), dones, infos
+
+    def close(self):
+        self._client.close()
+
+
+class RemoteEnv(gym.Env):
+    """
+    Presents the single env of an `EnvServer` as a normal env.
+    """
+    def __init__(self, address, observation_space, action_space):
+        """
+        :param address: Address of the server (see `EnvServer`).
+        :param gym.Space observation_space: The observation space of the served env.
+        :param gym.Space action_space: The action space of the served env.
+        """
+        super(RemoteEnv, self).__init__()
+        self._client = _Client(address, observation_space, action_space)
+        if self._client.num_envs != 1:
+            raise ValueError("Expected a server with a single env, got {}".format(self._client.num_envs))
+        self.observation_space = observation_space
+        self.action_space = action_space
+        self._mask = np.ones(1, dtype=np.uint8)
+
+    def reset(self):
+        self._client.reset(self._mask)
+        return _read(self._client.observations.from_flat(self._client.observations.buffer.copy()), 0)
+
+    def step(self, action):
+        client = self._client
+        client.step(_batch_of_one(action))
+        obs = _read(client.observations.from_flat(client.observations.buffer.copy()), 0)
+        return obs, float(client.rewards[0]), bool(client.dones[0]), {}
+
+    def close(self):
+        self._client.close()
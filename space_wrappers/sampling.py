@@ -0,0 +1,90 @@
+# sample whole batches from spaces
+from gym import spaces
+import numpy as np
+from .classify import assert_space
+from .transform import batched
+
+__all__ = ["sample_batch", "sample_original_batch"]
+
+
+def _integers(random_state, high, size):
+    # `np.random.Generator` and `np.random.RandomState` (or the `np.random` module) name this differently.
+    if hasattr(random_state, "integers"):
+        return random_state.integers(0, high, size=size)
+    return random_state.randint(0, high, size=size)
+
+
+def _sample_box(space, count, random_state):
+    shape = (count,) + space.shape
+    low = space.low.astype(np.float64)
+    high = space.high.astype(np.float64)
+    if np.issubdtype(space.dtype, np.integer):
+        # make the upper bound inclusive, as in `Box.sample`
+        high = high + 1.0
+
+    bounded_below = np.isfinite(low)
+    bounded_above = np.isfinite(high)
+    if bounded_below.all() and bounded_above.all():
+        sample = random_state.uniform(low, high, size=shape)
+    else:
+        # same distributions as `Box.sample`: uniform for bounded, shifted exponential
+        # for half-bounded and normal for unbounded dimensions.
+        finite_low = np.where(bounded_below, low, 0.0)
+        finite_high = np.where(bounded_above, high, 0.0)
+        sample = random_state.normal(size=shape)
+        exponential = random_state.exponential(size=shape)
+        sample = np.where(bounded_below & ~bounded_above, finite_low + exponential, sample)
+        sample = np.where(~bounded_below & bounded_above, finite_high - exponential, sample)
+        both = bounded_below & bounded_above
+        uniform = random_state.uniform(size=shape) * (finite_high - finite_low) + finite_low
+        sample = np.where(both, uniform, sample)
+
+    if np.issubdtype(space.dtype, np.integer):
+        sample = np.floor(sample)
+    return sample.astype(space.dtype)
+
+
+def sample_batch(space, count, random_state=None):
+    """
+    Draws `count` independent samples from `space` with a single call into
+    the random number generator per (sub)space. The result is the batch of
+    samples stacked along a new leading axis, or, for a `Tuple` space, a
+    tuple with one such batch per subspace.
+    :param gym.Space space: The space to sample from.
+    :param int count: The number of samples to draw.
+    :param random_state: A `np.random.Generator` or `np.random.RandomState`
+        used to generate the samples. Defaults to the global `np.random` state.
+    :return: The batch of samples.
+    :raises TypeError: If `space` is not a `gym.Space`.
+            NotImplementedError: If sampling from `space` is not supported.
+    """
+    assert_space(space)
+    if random_state is None:
+        random_state = np.random
+
+    if isinstance(space, spaces.Discrete):
+        return _integers(random_state, space.n, count) + getattr(space, "start", 0)
+    elif isinstance(space, spaces.MultiDiscrete):
+        nvec = np.asarray(space.nvec)
+        return _integers(random_state, nvec, (count,) + nvec.shape)
+    elif isinstance(space, spaces.MultiBinary):
+        return _integers(random_state, 2, (count,) + tuple(np.atleast_1d(space.n))).astype(np.int8)
+    elif isinstance(space, spaces.Box):
+        return _sample_box(space, count, random_state)
+    elif isinstance(space, spaces.Tuple):
+        return tuple(sample_batch(sub, count, random_state) for sub in space.spaces)
+
+    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+
+
+def sample_original_batch(trafo, count, random_state=None):
+    """
+    Draws `count` samples from the target space of the `Transform` `trafo`
+    and converts them, as a batch, to the original space. This is useful to
+    e.g. produce random exploration actions for the wrapped env directly.
+    :param Transform trafo: The transform whose target space is sampled.
+    :param int count: The number of samples to draw.
+    :param random_state: A `np.random.Generator` or `np.random.RandomState`.
+    :return: The batch of samples in the original space.
+    """
+    return batched(trafo.convert_from)(sample_batch(trafo.target, count, random_state))
@@ -0,0 +1,83 @@
+import gym
+import numpy as np
+from gym import spaces
+
+# Small deterministic envs shared by the tests.
+
+
+class EchoEnv(gym.Env):
+    """ Observes the last action, episodes end after `length` steps. """
+    def __init__(self, length=3):
+        super(EchoEnv, self).__init__()
+        self.observation_space = spaces.Box(-1.0, 1.0, shape=(2, 1), dtype=np.float32)
+        self.action_space = spaces.Box(-1.0, 1.0, shape=(2,), dtype=np.float32)
+        self.length = length
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return np.zeros((2, 1), dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        return np.reshape(action, (2, 1)), float(self.t), self.t == self.length, {"t": self.t}
+
+
+class CountingEnv(gym.Env):
+    """ Observation counts the steps, episodes end after `length` steps. """
+    def __init__(self, length=4):
+        super(CountingEnv, self).__init__()
+        self.observation_space = spaces.Box(0.0, 100.0, shape=(2, 2), dtype=np.float32)
+        self.action_space = spaces.MultiDiscrete([3, 2])
+        self.length = length
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return np.zeros((2, 2), dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        return np.full((2, 2), self.t, dtype=np.float32), float(self.t), self.t == self.length, {}
+
+
+class WalkEnv(gym.Env):
+    """ Discrete version of `EchoEnv`, with a reward of 0.5 per step. """
+    def __init__(self, length=2):
+        super(WalkEnv, self).__init__()
+        self.observation_space = spaces.Discrete(10)
+        self.action_space = spaces.Discrete(10)
+        self.length = length
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return 0
+
+    def step(self, action):
+        self.t += 1
+        return int(action), 0.5, self.t == self.length, {}
+
+
+class TimerEnv(gym.Env):
+    """
+    Observes and is rewarded with the step count, out of `Discrete(size)`.
+    Episodes end after `length` steps or, if `stop_action` is set, after
+    action 1.
+    """
+    def __init__(self, length=None, stop_action=False, size=10):
+        super(TimerEnv, self).__init__()
+        self.observation_space = spaces.Discrete(size)
+        self.action_space = spaces.Discrete(2)
+        self.length = length
+        self.stop_action = stop_action
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return 0
+
+    def step(self, action):
+        self.t += 1
+        done = self.t == self.length or (self.stop_action and action == 1)
+        return self.t, float(self.t), bool(done), {}
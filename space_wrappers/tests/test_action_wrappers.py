@@ -43,3 +43,14 @@ def test_rescaled_wrapper():
     expect.expectation = 0.5
     wrapper = RescaledActionWrapper(expect, np.array([1.0]), np.array([2.0]))
     wrapper.step(1.5)
+
+
+def test_branched_wrapper():
+    expect = ExpectEnv()
+    cont = spaces.Box(np.array([0.0]), np.array([1.0]), dtype=np.float32)
+    expect.action_space = cont
+    expect.expectation = 0.5
+    wrapper = BranchedActionWrapper(expect, 3)
+    assert wrapper.action_space.nvec.tolist() == [3]
+    wrapper.step([1])
+    wrapper.step(np.array([[0.0, 2.0, 1.0]]))
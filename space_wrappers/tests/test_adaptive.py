@@ -0,0 +1,81 @@
+from space_wrappers.adaptive import adaptive_discretize, AdaptivePartition
+from space_wrappers.classify import num_discrete_actions
+from space_wrappers.transform import batched
+from gym.spaces import Box, Discrete
+import numpy as np
+import pytest
+
+
+def test_initial_cell():
+    trafo = adaptive_discretize(Box(np.array([-1.0, 0.0]), np.array([1.0, 4.0])), max_cells=8)
+    assert trafo.target == Discrete(1)
+    assert trafo.convert_to(np.array([0.5, 3.0])) == 0
+    assert trafo.convert_from(0) == pytest.approx(np.array([0.0, 2.0]))
+
+
+def test_split_by_count():
+    space = Box(np.array([0.0, 0.0]), np.array([1.0, 4.0]))
+    trafo = adaptive_discretize(space, max_cells=8, split_count=3)
+    partition = trafo.convert_to
+    assert num_discrete_actions(trafo.target) == (1,)
+    points = np.array([[0.1, 0.1], [0.2, 0.3], [0.3, 0.2]])
+    assert list(partition.update(points)) == [0, 0, 0]
+
+    # split along the dimension that is widest relative to the bounds; both are equal, so the first.
+    assert trafo.target.n == 2
+    assert num_discrete_actions(trafo.target) == (2,)
+    assert list(partition.batch(np.array([[0.4, 1.0], [0.6, 1.0]]))) == [0, 1]
+    assert partition.counts[:2].tolist() == [0, 0]
+
+    # only the visited cell is refined further, now along dimension 1
+    partition.update(points)
+    assert trafo.target.n == 3
+    low, high = partition.bounds(np.arange(3))
+    assert low == pytest.approx(np.array([[0.0, 0.0], [0.5, 0.0], [0.0, 2.0]]))
+    assert high == pytest.approx(np.array([[0.5, 2.0], [1.0, 4.0], [0.5, 4.0]]))
+    centers = batched(trafo.convert_from)(np.arange(3))
+    assert centers == pytest.approx(np.array([[0.25, 1.0], [0.75, 2.0], [0.25, 3.0]]))
+
+
+def test_batch_matches_single():
+    space = Box(-1.0, 1.0, shape=(2, 2))
+    trafo = adaptive_discretize(space, max_cells=32, split_count=5)
+    rng = np.random.RandomState(0)
+    for _ in range(20):
+        trafo.convert_to.update(rng.normal(scale=0.3, size=(10, 2, 2)).clip(-1, 1))
+    assert trafo.target.n > 16
+    points = rng.uniform(-1, 1, size=(50, 2, 2))
+    cells = trafo.convert_to.batch(points)
+    assert list(cells) == [trafo.convert_to(p) for p in points]
+    low, high = trafo.convert_to.bounds(cells)
+    assert ((low <= points) & (points <= high)).all()
+
+
+def test_max_cells():
+    trafo = adaptive_discretize(Box(0.0, 1.0, shape=(1,)), max_cells=3, split_count=1)
+    partition = trafo.convert_to
+    partition.update(np.array([[0.1], [0.6]]))
+    assert trafo.target.n == 2
+    partition.update(np.array([[0.1], [0.6]]))
+    assert trafo.target.n == 3
+    partition.update(np.array([[0.1], [0.6], [0.9]]))
+    assert trafo.target.n == 3
+
+
+def test_split_by_variance():
+    partition = AdaptivePartition(Box(0.0, 1.0, shape=(1,)), max_cells=4, split_count=2, split_variance=0.5)
+    points = np.array([[0.2], [0.3]])
+    partition.update(points)
+    partition.update(points, values=np.array([1.0, 1.0]))
+    assert partition.num_cells == 1
+    partition.update(points, values=np.array([-1.0, 3.0]))
+    assert partition.num_cells == 2
+
+
+def test_checks():
+    with pytest.raises(TypeError):
+        adaptive_discretize(Discrete(3), max_cells=4)
+    with pytest.raises(ValueError):
+        adaptive_discretize(Box(0.0, np.inf, shape=(1,)), max_cells=4)
+    with pytest.raises(ValueError):
+        adaptive_discretize(Box(0.0, 1.0, shape=(1,)), max_cells=0)
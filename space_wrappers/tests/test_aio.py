@@ -0,0 +1,97 @@
+import asyncio
+import gym
+import numpy as np
+import pytest
+from gym import spaces
+from space_wrappers import DiscretizedActionWrapper, RescaledObservationWrapper, StackObservationWrapper, \
+    RepeatActionWrapper, FlattenedObservationWrapper
+from space_wrappers.aio import step_async, reset_async, register
+
+
+class AsyncEchoEnv(gym.Env):
+    """ An env that has to wait for its results, and echoes the action as observation. """
+    def __init__(self):
+        super(AsyncEchoEnv, self).__init__()
+        self.observation_space = spaces.Box(np.array([0.0]), np.array([1.0]), dtype=np.float32)
+        self.action_space = spaces.Box(np.array([0.0]), np.array([1.0]), dtype=np.float32)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _wait(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+
+    async def reset_async(self):
+        await self._wait()
+        return np.array([0.0])
+
+    async def step_async(self, action):
+        await self._wait()
+        return np.array([action]), 1.0, False, {}
+
+    def step(self, action):
+        raise AssertionError("synchronous step should not be called")
+
+    def reset(self):
+        raise AssertionError("synchronous reset should not be called")
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_wrapper_stack():
+    env = AsyncEchoEnv()
+    wrapped = DiscretizedActionWrapper(env, 3)
+    wrapped = RescaledObservationWrapper(wrapped, np.array([0.0]), np.array([2.0]))
+    wrapped = StackObservationWrapper(wrapped, 2)
+    wrapped = RepeatActionWrapper(wrapped, 1)
+
+    obs = run(reset_async(wrapped))
+    assert obs == pytest.approx(np.zeros((2, 1)))
+    obs, rew, done, info = run(step_async(wrapped, 1))
+    assert obs == pytest.approx(np.array([[1.0], [1.0]]))
+    assert rew == 2.0
+    assert info == {'skip.stepcount': 2}
+
+
+def test_many_in_flight():
+    env = AsyncEchoEnv()
+    wrapped = [FlattenedObservationWrapper(DiscretizedActionWrapper(env, 3)) for i in range(50)]
+
+    async def step_all():
+        return await asyncio.gather(*[step_async(w, 2) for w in wrapped])
+
+    results = run(step_all())
+    assert len(results) == 50
+    assert env.max_in_flight == 50
+    assert results[0][0] == pytest.approx([1.0])
+
+
+def test_sync_fallback():
+    class SyncEnv(gym.Env):
+        observation_space = spaces.Discrete(3)
+        action_space = spaces.Discrete(3)
+
+        def reset(self):
+            return 0
+
+        def step(self, action):
+            return action, 0.0, True, {}
+
+    class CustomWrapper(gym.Wrapper):
+        def step(self, action):
+            obs, rew, done, info = self.env.step(action)
+            return obs + 1, rew, done, info
+
+    assert run(reset_async(CustomWrapper(SyncEnv()))) == 0
+    assert run(step_async(CustomWrapper(SyncEnv()), 1))[0] == 2
+
+    async def custom_step(wrapper, action):
+        obs, rew, done, info = await step_async(wrapper.env, action)
+        return obs + 2, rew, done, info
+
+    register(CustomWrapper, step=custom_step)
+    assert run(step_async(CustomWrapper(SyncEnv()), 1))[0] == 3
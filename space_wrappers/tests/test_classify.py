@@ -64,3 +64,58 @@ def test_num_discrete_actions():
 
     with pytest.raises(NotImplementedError):
         num_discrete_actions(UnknownSpace())
+
+
+def test_space_info():
+    info = space_info(Discrete(10))
+    assert info.discrete and info.flat and not info.compound
+    assert info.flat_size == 1
+    assert info.cardinality == 10
+
+    info = space_info(MultiDiscrete([4, 5]))
+    assert info.num_discrete_actions == (4, 5)
+    assert info.cardinality == 20
+    assert info.flat_size == 1
+
+    info = space_info(MultiBinary(3))
+    assert info.cardinality == 8
+
+    info = space_info(Box(np.zeros((2, 3)), np.ones((2, 3)), dtype=np.float32))
+    assert not info.discrete and not info.flat
+    assert info.flat_size == 6
+    assert info.cardinality is None
+    assert info.bounded
+    assert info.shape == (2, 3)
+    assert info.dtype == np.float32
+    assert not space_info(Box(-np.inf, np.inf, shape=(2,), dtype=np.float32)).bounded
+
+    info = space_info(Tuple((Box(np.zeros(3), np.ones(3), dtype=np.float32), Discrete(4),
+                             Box(np.zeros((2, 2)), np.ones((2, 2)), dtype=np.float32))))
+    assert info.offsets == (0, 3, 4)
+    assert info.flat_size == 8
+    assert not info.discrete
+    assert space_info(Tuple((Discrete(5), Discrete(4)))).cardinality == 20
+
+    with pytest.raises(TypeError):
+        space_info(5)
+
+    with pytest.raises(NotImplementedError):
+        space_info(UnknownSpace())
+
+
+def test_space_info_cached():
+    space = MultiDiscrete([4, 5])
+    assert space_info(space) is space_info(space)
+    # equal, but different, spaces get their own entries
+    assert space_info(MultiDiscrete([4, 5])) is not space_info(space)
+
+    # entries are removed when the space is collected
+    from space_wrappers import classify
+    import gc
+    space = Discrete(3)
+    space_info(space)
+    key = id(space)
+    assert key in classify._info_cache
+    del space
+    gc.collect()
+    assert key not in classify._info_cache
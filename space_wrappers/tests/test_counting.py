@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from gym import spaces
+from space_wrappers.counting import DenseCountTable, HashedCountTable, count_table, CountBonusWrapper, \
+    VectorCountBonusWrapper
+from space_wrappers.vector import ThreadedVectorEnv
+from space_wrappers.tests.envs import WalkEnv
+
+
+@pytest.mark.parametrize("table", [DenseCountTable(100), HashedCountTable(16)])
+def test_count_table(table):
+    assert list(table.update([3, 5, 3])) == [2, 1, 2]
+    assert list(table.update(np.array([5, 7]))) == [2, 1]
+    assert list(table.get([3, 5, 7, 9])) == [2, 2, 1, 0]
+
+
+def test_hashed_collisions():
+    table = HashedCountTable(128)
+    states = np.arange(0, 64 * 1000, 1000)
+    rng = np.random.RandomState(1)
+    for _ in range(5):
+        table.update(rng.permutation(states))
+    assert table.size == 64
+    assert table.overflow == 0
+    assert (table.get(states) == 5).all()
+    assert list(table.get([1, 2])) == [0, 0]
+
+
+def test_hashed_overflow():
+    table = HashedCountTable(8)
+    counts = table.update(np.arange(20))
+    assert table.size == 8
+    assert table.overflow == 12
+    # counts of states without a slot are shared, i.e. overestimated
+    assert counts.sum() >= 20
+    assert (table.update(np.arange(20)) >= 2).all()
+
+
+def test_count_table_choice():
+    assert isinstance(count_table(spaces.Discrete(100)), DenseCountTable)
+    assert isinstance(count_table(spaces.Discrete(10 ** 12), capacity=1000), HashedCountTable)
+    with pytest.raises(TypeError):
+        count_table(spaces.MultiDiscrete([2, 3]))
+    assert count_table(spaces.Discrete(2), n=100).counts.shape == (100,)
+    with pytest.raises(ValueError):
+        count_table(spaces.Discrete(100), n=10)
+
+
+def test_count_bonus_wrapper():
+    env = CountBonusWrapper(WalkEnv(length=100), scale=2.0)
+    env.reset()
+    assert env.step(4)[3]["count_bonus"] == pytest.approx(2.0)
+    assert env.step(4)[3]["count_bonus"] == pytest.approx(2.0 / np.sqrt(2))
+
+    env = CountBonusWrapper(WalkEnv(length=100), add_to_reward=True)
+    env.reset()
+    obs, reward, done, info = env.step(4)
+    assert reward == pytest.approx(1.5)
+    assert "count_bonus" not in info
+
+
+def test_vector_count_bonus_wrapper():
+    venv = VectorCountBonusWrapper(ThreadedVectorEnv([WalkEnv, WalkEnv]))
+    venv.reset()
+    obs, rewards, dones, infos = venv.step(np.array([3, 3]))
+    assert [i["count_bonus"] for i in infos] == pytest.approx([1 / np.sqrt(2)] * 2)
+    # terminal observations are counted, not those after the reset
+    obs, rewards, dones, infos = venv.step(np.array([3, 5]))
+    assert list(dones) == [True, True]
+    assert [i["count_bonus"] for i in infos] == pytest.approx([1 / np.sqrt(3), 1.0])
+    assert list(venv.counts.get([0, 3, 5])) == [0, 3, 1]
+
+    venv = VectorCountBonusWrapper(ThreadedVectorEnv([WalkEnv, WalkEnv]), scale=0.5, add_to_reward=True)
+    venv.reset()
+    obs, rewards, dones, infos = venv.step(np.array([3, 4]))
+    assert rewards == pytest.approx(np.array([1.0, 1.0]))
+    venv.close()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from gym.spaces import MultiDiscrete, MultiBinary
+from space_wrappers.masking import flat_mask, masked_argmax, masked_sample
+from space_wrappers.transform import flatten, batched
+
+
+def reference_mask(space, masks):
+    trafo = flatten(space)
+    return np.array([all(m[v] for m, v in zip(masks, trafo.convert_from(i))) for i in range(trafo.target.n)])
+
+
+def test_flat_mask():
+    space = MultiDiscrete([2, 3, 2])
+    masks = [np.array([True, False]), np.array([True, True, False]), np.array([False, True])]
+    assert (flat_mask(space, masks) == reference_mask(space, masks)).all()
+
+    space = MultiBinary(3)
+    masks = [np.array([True, True]), np.array([False, True]), np.array([True, False])]
+    assert (flat_mask(space, masks) == reference_mask(space, masks)).all()
+
+
+def test_flat_mask_batched():
+    space = MultiDiscrete([3, 4])
+    rng = np.random.RandomState(0)
+    masks = [rng.uniform(size=(5, 3)) > 0.3, rng.uniform(size=(5, 4)) > 0.3]
+    result = flat_mask(space, masks)
+    assert result.shape == (5, 12)
+    for b in range(5):
+        assert (result[b] == reference_mask(space, [masks[0][b], masks[1][b]])).all()
+
+
+def test_mask_errors():
+    space = MultiDiscrete([3, 4])
+    with pytest.raises(ValueError):
+        flat_mask(space, [np.ones(3, dtype=bool)])
+    with pytest.raises(ValueError):
+        flat_mask(space, [np.ones(3, dtype=bool), np.ones(3, dtype=bool)])
+    with pytest.raises(ValueError):
+        masked_argmax(space, np.zeros(12), [np.zeros(3, dtype=bool), np.ones(4, dtype=bool)])
+    with pytest.raises(ValueError):
+        masked_sample(space, [np.zeros(3, dtype=bool), np.ones(4, dtype=bool)])
+
+
+def test_masked_argmax():
+    space = MultiDiscrete([3, 4])
+    rng = np.random.RandomState(1)
+    values = rng.normal(size=(6, 12))
+    masks = [rng.uniform(size=(6, 3)) > 0.3, rng.uniform(size=(6, 4)) > 0.3]
+    masks[0][:, 0] = True
+    masks[1][:, 0] = True
+    expected = np.argmax(np.where(flat_mask(space, masks), values, -np.inf), axis=1)
+    assert list(masked_argmax(space, values, masks)) == list(expected)
+
+    # single entry
+    assert masked_argmax(space, values[0], [masks[0][0], masks[1][0]]) == expected[0]
+
+
+def test_masked_sample():
+    space = MultiDiscrete([3, 4])
+    masks = [np.array([True, False, True]), np.array([False, True, False, True])]
+    valid = set(np.flatnonzero(flat_mask(space, masks)))
+    batch = [np.repeat(masks[0][None], 400, axis=0), np.repeat(masks[1][None], 400, axis=0)]
+    samples = masked_sample(space, batch, np.random.default_rng(3))
+    assert samples.shape == (400,)
+    assert set(samples) == valid
+
+    assert masked_sample(space, masks) in valid
+
+
+def test_masked_sample_large():
+    # 10**15 flat actions: neither the flat mask nor the flattening table could be built
+    space = MultiDiscrete([10] * 15)
+    trafo = flatten(space)
+    even = np.arange(10) % 2 == 0
+    samples = masked_sample(space, [np.repeat(even[None], 50, axis=0)] * 15, np.random.default_rng(0))
+    actions = batched(trafo.convert_from)(samples)
+    assert actions.shape == (50, 15)
+    assert (actions % 2 == 0).all()
+    assert (batched(trafo.convert_to)(actions) == samples).all()
+    assert trafo.convert_to(trafo.convert_from(samples[0])) == samples[0]
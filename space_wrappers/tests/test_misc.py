@@ -1,10 +1,11 @@
+import gym
+import numpy as np
 import pytest
 from gym import spaces
 from space_wrappers.misc import *
-try:
-    from unittest import mock
-except ImportError:
-    import mock
+from space_wrappers.vector import ThreadedVectorEnv
+from space_wrappers.tests.envs import TimerEnv
+from unittest import mock
 
 
 @pytest.fixture()
@@ -45,3 +46,133 @@ def test_repeat_action_wrapper(env):
     assert done is False
     assert info == {'skip.stepcount': 4}
 
+
+def test_observe_last_action(env):
+    env.observation_space = spaces.Box(0.0, 1.0, shape=(2,), dtype=np.float32)
+    env.action_space = spaces.Discrete(3)
+    env.reset.return_value = np.zeros(2)
+    env.step = lambda x: (np.ones(2), 1.0, False, {})
+
+    wrapped = ObserveLastActionWrapper(env)
+    assert wrapped.observation_space == spaces.Tuple((env.observation_space, env.action_space))
+    obs, action = wrapped.step(2)[0]
+    assert action == 2
+
+
+@pytest.mark.parametrize("reuse_buffer", [False, True])
+def test_observe_last_action_flat(env, reuse_buffer):
+    env.observation_space = spaces.Box(0.0, 1.0, shape=(2, 1), dtype=np.float32)
+    env.action_space = spaces.Discrete(3)
+    env.reset.return_value = np.zeros((2, 1))
+    env.step = lambda x: (np.full((2, 1), 0.5), 1.0, False, {})
+
+    wrapped = ObserveLastActionWrapper(env, flat=True, reuse_buffer=reuse_buffer)
+    assert wrapped.observation_space.shape == (5,)
+    first = wrapped.reset()
+    assert list(first) == [0, 0, 0, 0, 0]
+    obs, _, _, _ = wrapped.step(2)
+    assert wrapped.observation_space.contains(obs)
+    assert list(obs) == [0.5, 0.5, 0, 0, 1]
+    assert (obs is first) == reuse_buffer
+
+    env.action_space = spaces.Box(np.array([0.0, -2.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    wrapped = ObserveLastActionWrapper(env, flat=True)
+    assert list(wrapped.reset()) == [0, 0, -1, 0]
+    obs, _, _, _ = wrapped.step(np.array([1.0, 1.0]))
+    assert obs == pytest.approx(np.array([0.5, 0.5, 1.0, 0.5]))
+
+
+def test_vector_observe_last_action():
+    venv = VectorObserveLastActionWrapper(ThreadedVectorEnv([lambda: TimerEnv(2, size=3)] * 2),
+                                          default_action=0)
+    assert venv.observation_space.shape == (5,)
+    assert venv.reset().tolist() == [[1, 0, 0, 1, 0]] * 2
+    assert venv.step(np.array([0, 1]))[0].tolist() == [[0, 1, 0, 1, 0], [0, 1, 0, 0, 1]]
+    obs, rewards, dones, infos = venv.step(np.array([1, 0]))
+    assert list(dones) == [True, True]
+    assert obs.tolist() == [[1, 0, 0, 1, 0]] * 2
+    assert infos[0]["terminal_observation"].tolist() == [0, 0, 1, 0, 1]
+    assert infos[1]["terminal_observation"].tolist() == [0, 0, 1, 1, 0]
+    venv.close()
+
+
+def test_continuing_env_wrapper(env):
+    env.step = lambda x: (x, 1.0, False, {})
+    metrics = MetricsRingBuffer(4)
+    wrapped = ContinuingEnvWrapper(env, gamma=0.5, duration=3, metrics=metrics)
+    wrapped.reset()
+    assert wrapped.step(0)[1:3] == (1.0, False)
+    assert wrapped.step(0)[1:3] == (1.0, False)
+    assert wrapped.step(0)[1:3] == (2.0, True)
+    assert metrics.count == 1
+    assert metrics.records()[0].tolist() == (0, 3.0, 1.0, 2.0)
+
+    wrapped.reset()
+    assert wrapped.step(0)[2] is False
+
+
+def test_metrics_ring_buffer():
+    buffer = MetricsRingBuffer(3)
+    records = np.zeros(2, dtype=EPISODE_METRICS)
+    for i in range(3):
+        records["env"] = [2 * i, 2 * i + 1]
+        buffer(records)
+    assert buffer.count == 6
+    assert list(buffer.records()["env"]) == [3, 4, 5]
+    buffer(np.zeros(5, dtype=EPISODE_METRICS))
+    assert buffer.count == 11
+    assert len(buffer.records()) == 3
+
+
+def test_vector_continuing_env_wrapper():
+    metrics = MetricsRingBuffer(10)
+    venv = VectorContinuingEnvWrapper(ThreadedVectorEnv([lambda: TimerEnv(stop_action=True)] * 2), gamma=0.5,
+                                      duration=2, metrics=metrics)
+    venv.reset()
+    obs, rewards, dones, infos = venv.step(np.array([0, 1]))
+    assert list(rewards) == [1.0, 1.0]
+    assert list(dones) == [False, True]
+    obs, rewards, dones, infos = venv.step(np.array([0, 0]))
+    # first env terminated by the wrapper: (1 + 2) / 2 / (1 - 0.5)
+    assert list(rewards) == [3.0, 1.0]
+    assert list(dones) == [True, False]
+    assert infos[0]["terminal_observation"] == 2
+    # and reset
+    assert list(obs) == [0, 1]
+    assert metrics.records().tolist() == [(0, 3.0, 1.5, 3.0)]
+
+    obs, rewards, dones, infos = venv.step(np.array([0, 0]))
+    assert list(rewards) == [1.0, 3.0]
+    assert list(dones) == [False, True]
+    assert list(obs) == [1, 0]
+    assert metrics.count == 2
+    venv.close()
+
+
+def test_vector_continuing_last_action():
+    # the masked reset keeps the last actions of the sub-envs that are not reset
+    inner = VectorObserveLastActionWrapper(ThreadedVectorEnv([lambda: TimerEnv(size=4)] * 2), default_action=0)
+    venv = VectorContinuingEnvWrapper(inner, gamma=0.5, duration=2)
+    venv.reset()
+    venv.step(np.array([1, 1]))
+    venv.reset(np.array([False, True]))
+    obs, rewards, dones, infos = venv.step(np.array([1, 1]))
+    assert list(dones) == [True, False]
+    assert obs.tolist() == [[1, 0, 0, 0, 1, 0], [0, 1, 0, 0, 0, 1]]
+    assert infos[0]["terminal_observation"].tolist() == [0, 0, 1, 0, 0, 1]
+    venv.close()
+
+
+def test_observe_last_action_multi_discrete(env):
+    env.observation_space = spaces.MultiBinary(2)
+    env.action_space = spaces.MultiDiscrete([20, 30, 40])
+    env.reset.return_value = np.array([1, 0], dtype=np.int8)
+    env.step = lambda x: (np.array([0, 1], dtype=np.int8), 1.0, False, {})
+
+    # per-dimension one-hot: 2 * 2 + 20 + 30 + 40 entries, not 4 + 20 * 30 * 40
+    wrapped = ObserveLastActionWrapper(env, flat=True)
+    assert wrapped.observation_space.shape == (94,)
+    obs = wrapped.reset()
+    assert list(np.flatnonzero(obs)) == [1, 2]
+    obs, _, _, _ = wrapped.step(np.array([3, 0, 39]))
+    assert list(np.flatnonzero(obs)) == [0, 3, 4 + 3, 4 + 20, 4 + 50 + 39]
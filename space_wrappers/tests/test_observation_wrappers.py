@@ -48,3 +48,124 @@ def test_rescaled_wrapper():
     o, r, d, i = wrapper.step(1.5)
     assert wrapper.observation_space.contains(o)
     assert o == 1.5
+
+
+def test_quantized_wrapper():
+    expect = ProvideEnv()
+    bx = spaces.Box(np.array([0.0, 0.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    expect.observation_space = bx
+    expect.provide_observation = np.array([0.0, 2.0])
+    wrapper = QuantizedObservationWrapper(expect)
+    o, r, d, i = wrapper.step(0)
+    assert wrapper.observation_space.contains(o)
+    assert list(o) == [0, 255]
+    assert wrapper.dequantize(np.stack([o, o])) == pytest.approx(np.array([[0.0, 2.0], [0.0, 2.0]]))
+
+
+@pytest.mark.parametrize("reuse_buffer", [False, True])
+def test_downsampled_wrapper(reuse_buffer):
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Box(0, 255, shape=(4, 4, 3), dtype=np.uint8)
+    expect.provide_observation = np.full((4, 4, 3), 100, dtype=np.uint8)
+    wrapper = DownsampledObservationWrapper(expect, 2, grayscale=True, reuse_buffer=reuse_buffer)
+    assert wrapper.observation_space.shape == (2, 2)
+    o, r, d, i = wrapper.step(0)
+    assert wrapper.observation_space.contains(o)
+    assert o.dtype == np.uint8
+    assert o == pytest.approx(np.full((2, 2), 100.0))
+    o2, r, d, i = wrapper.step(0)
+    assert (o2 is o) == reuse_buffer
+
+
+def test_adaptive_discretized_wrapper():
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Box(np.array([0.0, 0.0]), np.array([1.0, 1.0]), dtype=np.float32)
+    expect.provide_observation = np.array([0.9, 0.1])
+    wrapper = AdaptiveDiscretizedObservationWrapper(expect, max_cells=4, split_count=2)
+    assert wrapper.observation_space.n == 1
+    assert wrapper.step(0)[0] == 0
+    assert wrapper.step(0)[0] == 0
+    # second visit split the single cell along dimension 0
+    assert wrapper.observation_space.n == 2
+    o, r, d, i = wrapper.step(0)
+    assert o == 1
+    assert wrapper.observation_space.contains(o)
+
+    wrapper.refine = False
+    for _ in range(5):
+        wrapper.step(0)
+    assert wrapper.observation_space.n == 2
+
+
+def test_adaptive_discretized_consumers():
+    # consumers sized with max_cells keep working as the space grows
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Box(0.0, 1.0, shape=(1,), dtype=np.float32)
+    expect.provide_observation = np.array([0.9])
+    adaptive = AdaptiveDiscretizedObservationWrapper(expect, max_cells=4, split_count=1)
+    counted = CountBonusWrapper(adaptive, n=4)
+    wrapper = OneHotObservationWrapper(counted, n=4)
+    assert wrapper.observation_space.shape == (4,)
+    # each step refines the cell containing 0.9, which gets the next id
+    for _ in range(4):
+        o, r, d, i = wrapper.step(0)
+    assert adaptive.observation_space.n == 4
+    assert o.tolist() == [0, 0, 0, 1]
+    assert i["count_bonus"] == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        OneHotObservationWrapper(adaptive, n=2)
+
+
+@pytest.mark.parametrize("reuse_buffer", [False, True])
+def test_one_hot_wrapper(reuse_buffer):
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Discrete(3)
+    expect.provide_observation = 1
+    wrapper = OneHotObservationWrapper(expect, reuse_buffer=reuse_buffer)
+    o, r, d, i = wrapper.step(0)
+    assert wrapper.observation_space.contains(o)
+    assert list(o) == [0, 1, 0]
+    o2, r, d, i = wrapper.step(0)
+    assert (o2 is o) == reuse_buffer
+
+    wrapper = OneHotObservationWrapper(expect, sparse=True, reuse_buffer=reuse_buffer)
+    o, r, d, i = wrapper.step(0)
+    assert list(o.indices) == [1]
+    assert wrapper.observation_space.contains(o)
+
+
+def test_one_hot_wrapper_huge():
+    import tracemalloc
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Discrete(10 ** 12)
+    expect.provide_observation = 10 ** 12 - 1
+    tracemalloc.start()
+    wrapper = OneHotObservationWrapper(expect, validate=1.0)
+    o, r, d, i = wrapper.step(0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 10 ** 6
+    assert wrapper.observation_space.contains(o)
+    assert list(o.indices) == [10 ** 12 - 1]
+    assert wrapper.validation.checked == 1
+    assert wrapper.validation.total_violations == 0
+
+
+def test_validation():
+    expect = ProvideEnv()
+    expect.observation_space = spaces.Box(np.array([0.0, 0.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    expect.provide_observation = np.array([0.5, 3.0])
+    wrapper = QuantizedObservationWrapper(expect, validate=1.0)
+    wrapper.step(0)
+    assert wrapper.validation.checked == 1
+    assert wrapper.validation.total_violations == 0
+
+    # out of bounds observation is not detected by quantize, but by rescale
+    wrapper = RescaledObservationWrapper(expect, -1.0, 1.0, validate=1.0)
+    wrapper.step(0)
+    assert wrapper.validation.violations == {("convert_to", "bounds"): 1}
+
+    wrapper = RescaledObservationWrapper(expect, -1.0, 1.0)
+    wrapper.step(0)
+    assert wrapper.validation.checked == 0
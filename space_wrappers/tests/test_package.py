@@ -0,0 +1,24 @@
+import subprocess
+import sys
+import pytest
+import space_wrappers
+
+
+def test_lazy_import():
+    # importing the package itself must not import gym or any of the submodules
+    code = "import sys, space_wrappers; print(sorted(m for m in sys.modules " \
+           "if m == 'gym' or m.startswith('space_wrappers.')))"
+    output = subprocess.check_output([sys.executable, "-c", code])
+    assert output.strip() == b"[]"
+
+
+def test_exports():
+    from space_wrappers.action_wrappers import FlattenedActionWrapper
+    assert space_wrappers.FlattenedActionWrapper is FlattenedActionWrapper
+    assert space_wrappers.transform.flatten is not None
+    for name in space_wrappers.__all__:
+        assert getattr(space_wrappers, name) is not None
+    assert "DiscretizedActionWrapper" in dir(space_wrappers)
+
+    with pytest.raises(AttributeError):
+        space_wrappers.DoesNotExist
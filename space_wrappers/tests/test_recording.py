@@ -0,0 +1,77 @@
+import gym
+import numpy as np
+import pytest
+from space_wrappers.recording import RecordingWrapper, Recording, ReplayEnv
+from space_wrappers.observation_wrappers import FlattenedObservationWrapper
+from space_wrappers.tests.envs import CountingEnv
+
+
+def record(directory, episodes=3):
+    env = RecordingWrapper(CountingEnv(), directory, chunk_size=8, block_size=2)
+    for episode in range(episodes):
+        env.reset()
+        done = False
+        while not done:
+            obs, rew, done, info = env.step((2, 1))
+    env.close()
+    return env
+
+
+def test_recording_roundtrip(tmpdir):
+    directory = str(tmpdir.join("rec"))
+    env = record(directory)
+
+    rec = Recording(directory)
+    # three episodes of one reset and four steps each
+    assert len(rec) == 15
+    assert rec.lengths == [8, 7]
+    assert rec.observation_space == env.observation_space
+    assert rec.observations[0].shape == (8, 4)
+
+    obs = np.concatenate(rec.observations)
+    assert list(obs[:, 0]) == [0, 1, 2, 3, 4] * 3
+    assert list(np.concatenate(rec.episodes)) == [0] * 5 + [1] * 5 + [2] * 5
+    assert list(np.concatenate(rec.dones)) == [False] * 4 + [True] + [False] * 4 + [True] + [False] * 4 + [True]
+    assert list(np.concatenate(rec.rewards)[:5]) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    # flattened actions; reset rows contain a zero action
+    assert list(np.concatenate(rec.actions)[:5]) == [0, 5, 5, 5, 5]
+    # data is memory mapped, not loaded
+    assert isinstance(rec.observations[0].base, np.memmap) or isinstance(rec.observations[0], np.memmap)
+
+
+def test_recording_checks(tmpdir):
+    with pytest.raises(ValueError):
+        RecordingWrapper(CountingEnv(), str(tmpdir), chunk_size=10, block_size=3)
+
+
+def test_replay(tmpdir):
+    directory = str(tmpdir.join("rec"))
+    record(directory, episodes=2)
+
+    env = ReplayEnv(directory, check_actions=True)
+    assert env.observation_space == CountingEnv().observation_space
+    assert env.action_space == CountingEnv().action_space
+    # replay twice as many episodes as were recorded
+    for episode in range(4):
+        assert env.reset() == pytest.approx(np.zeros((2, 2)))
+        for t in range(1, 5):
+            obs, rew, done, info = env.step((2, 1))
+            assert obs == pytest.approx(np.full((2, 2), t))
+            assert rew == t
+            assert done == (t == 4)
+
+    with pytest.raises(gym.error.ResetNeeded):
+        env.step((2, 1))
+
+    env.reset()
+    with pytest.raises(gym.error.Error):
+        env.step((0, 1))
+
+
+def test_replay_wrapped(tmpdir):
+    directory = str(tmpdir.join("rec"))
+    record(directory, episodes=1)
+    env = FlattenedObservationWrapper(ReplayEnv(directory))
+    env.reset()
+    obs, rew, done, info = env.step(None)
+    assert obs == pytest.approx(np.ones(4))
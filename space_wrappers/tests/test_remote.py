@@ -0,0 +1,87 @@
+import os
+import threading
+import numpy as np
+import pytest
+from gym import spaces
+from space_wrappers.remote import EnvServer, RemoteVectorEnv, RemoteEnv
+from space_wrappers.action_wrappers import DiscretizedActionWrapper
+from space_wrappers.tests.envs import EchoEnv
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def address(request, tmpdir):
+    if request.param == "unix":
+        return os.path.join(str(tmpdir), "env.sock")
+    return ("127.0.0.1", 0)
+
+
+def serve(envs, address):
+    server = EnvServer(envs, address)
+    thread = threading.Thread(target=server.serve)
+    thread.daemon = True
+    thread.start()
+    return server, thread
+
+
+def test_remote_vector_env(address):
+    server, thread = serve([EchoEnv(3), EchoEnv(2)], address)
+    env = EchoEnv()
+    venv = RemoteVectorEnv(server.address, env.observation_space, env.action_space)
+    assert venv.num_envs == 2
+
+    obs = venv.reset()
+    assert obs.shape == (2, 2, 1)
+    assert (obs == 0).all()
+
+    actions = np.array([[0.5, -0.5], [0.25, 1.0]], dtype=np.float32)
+    obs, rew, done, info = venv.step(actions)
+    assert obs[:, :, 0] == pytest.approx(actions)
+    assert list(rew) == [1.0, 1.0]
+    assert list(done) == [False, False]
+
+    obs, rew, done, info = venv.step(actions)
+    assert list(done) == [False, True]
+    # second env has been reset
+    assert obs[1] == pytest.approx(np.zeros((2, 1)))
+    assert obs[0] == pytest.approx(np.reshape(actions[0], (2, 1)))
+    assert info[1]["terminal_observation"] == pytest.approx(np.reshape(actions[1], (2, 1)))
+
+    venv.close()
+    thread.join()
+    server.close()
+
+
+def test_remote_env_wrapped(address):
+    server, thread = serve([EchoEnv(2)], address)
+    env = EchoEnv()
+    remote = RemoteEnv(server.address, env.observation_space, env.action_space)
+    wrapped = DiscretizedActionWrapper(remote, 3)
+
+    assert wrapped.reset() == pytest.approx(np.zeros((2, 1)))
+    obs, rew, done, info = wrapped.step(np.array([0, 2]))
+    assert obs == pytest.approx(np.array([[-1.0], [1.0]]))
+    assert rew == 1.0
+    assert not done
+    obs, rew, done, info = wrapped.step(np.array([1, 1]))
+    assert done
+
+    wrapped.close()
+    thread.join()
+    server.close()
+
+
+def test_remote_space_mismatch(address):
+    server, thread = serve([EchoEnv()], address)
+    with pytest.raises(ValueError):
+        RemoteEnv(server.address, spaces.Discrete(3), EchoEnv().action_space)
+    thread.join()
+    server.close()
+
+
+def test_server_rebind(address):
+    for i in range(2):
+        server, thread = serve([EchoEnv()], address)
+        env = EchoEnv()
+        RemoteEnv(server.address, env.observation_space, env.action_space).close()
+        thread.join()
+        server.close()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from gym.spaces import Box, Discrete, MultiDiscrete, MultiBinary, Tuple
+from space_wrappers.sampling import sample_batch, sample_original_batch
+from space_wrappers.transform import discretize, flatten, rescale, batched
+
+
+@pytest.fixture(params=["generator", "random_state"])
+def rng(request):
+    if request.param == "generator":
+        return np.random.default_rng(5)
+    return np.random.RandomState(5)
+
+
+@pytest.mark.parametrize("space", [Discrete(7), MultiDiscrete([2, 5, 3]), MultiBinary(4),
+                                   Box(np.array([0.0, -1.0]), np.array([1.0, 1.0]), dtype=np.float32),
+                                   Box(-np.inf, np.inf, shape=(2, 2), dtype=np.float32),
+                                   Box(np.array([0.0, -np.inf]), np.array([np.inf, 0.0]), dtype=np.float32),
+                                   Box(0, 4, shape=(3,), dtype=np.int64)])
+def test_sample_batch_contained(space, rng):
+    batch = sample_batch(space, 50, rng)
+    assert len(batch) == 50
+    for sample in batch:
+        assert space.contains(sample), sample
+
+
+def test_sample_batch_covers_discrete(rng):
+    batch = sample_batch(MultiDiscrete([2, 3]), 500, rng)
+    assert set(map(tuple, batch)) == {(i, j) for i in range(2) for j in range(3)}
+
+
+def test_sample_batch_tuple(rng):
+    space = Tuple((Discrete(3), Box(0.0, 1.0, shape=(2,), dtype=np.float32)))
+    d, b = sample_batch(space, 10, rng)
+    assert d.shape == (10,)
+    assert b.shape == (10, 2)
+
+
+def test_sample_batch_errors():
+    with pytest.raises(TypeError):
+        sample_batch(5, 10)
+
+
+def test_sample_original_batch(rng):
+    space = MultiDiscrete([3, 4])
+    trafo = flatten(space)
+    batch = sample_original_batch(trafo, 20, rng)
+    assert batch.shape == (20, 2)
+    for sample in batch:
+        assert space.contains(sample)
+
+    space = Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    trafo = discretize(space, 3)
+    batch = sample_original_batch(trafo, 20, rng)
+    assert batch.shape == (20, 2)
+    assert set(batch[:, 0]) <= {0.0, 0.5, 1.0}
+
+
+def test_batched_matches_single():
+    space = MultiDiscrete([3, 4, 2])
+    trafo = flatten(space)
+    flat = np.arange(24)
+    multi = batched(trafo.convert_from)(flat)
+    assert [tuple(m) for m in multi] == [trafo.convert_from(i) for i in flat]
+    assert list(batched(trafo.convert_to)(multi)) == list(flat)
+
+    space = Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    trafo = rescale(space, -1.0, 1.0)
+    x = np.array([[0.0, 1.0], [1.0, 2.0]])
+    assert batched(trafo.convert_to)(x) == pytest.approx(np.array([[-1.0, -1.0], [1.0, 1.0]]))
+
+    trafo = flatten(Tuple((Box(0.0, 1.0, shape=(2, 2), dtype=np.float32), Box(0.0, 1.0, shape=(1,), dtype=np.float32))))
+    flat = batched(trafo.convert_to)((np.zeros((3, 2, 2)), np.ones((3, 1))))
+    assert flat.shape == (3, 5)
+    a, b = batched(trafo.convert_from)(flat)
+    assert a.shape == (3, 2, 2)
+    assert b.shape == (3, 1)
+
+    # callables without a batch implementation are applied elementwise
+    assert list(batched(lambda x: 2 * x)([1, 2, 3])) == [2, 4, 6]
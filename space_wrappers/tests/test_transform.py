@@ -1,5 +1,6 @@
 import gym
-from space_wrappers.transform import discretize, flatten, rescale
+from space_wrappers.transform import discretize, flatten, rescale, quantize, branch, downsample, one_hot, batched, \
+    validated, ValidationStats, Transform, SparseOneHot, SparseOneHotSpace
 from gym.spaces import Box, Discrete, MultiDiscrete, MultiBinary, Tuple
 import numpy as np
 import itertools
@@ -57,6 +58,12 @@ def test_discretize_nd_box():
     # check that it also works with np.ndarray data
     check_convert(trafo, np.array([0, 0]), [0.0, 1.0])
 
+    # higher rank boxes
+    cont = Box(0.0, 1.0, shape=(2, 2), dtype=np.float32)
+    trafo = discretize(cont, 3)
+    assert trafo.target == expects(MultiDiscrete([3, 3, 3, 3]))
+    check_convert(trafo, (0, 1, 2, 0), [[0.0, 0.5], [1.0, 0.0]])
+
 
 def test_discretize_errors():
     cont = Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32)
@@ -76,6 +83,75 @@ def test_discretize_errors():
         trafo = discretize(cont, [5, 5, 5])
 
 
+# branch
+def test_branch_box():
+    from space_wrappers.tests.space_equal import expects
+
+    cont = Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    trafo = branch(cont, (3, 5))
+
+    assert trafo.target == expects(MultiDiscrete([3, 5]))
+    check_convert(trafo, [0, 0], [0.0, 1.0])
+    check_convert(trafo, [2, 4], [1.0, 2.0])
+    check_convert(trafo, [1, 1], [0.5, 1.25])
+
+    # batches
+    assert trafo.convert_from(np.array([[0, 0], [2, 4]])) == pytest.approx(np.array([[0.0, 1.0], [1.0, 2.0]]))
+    assert trafo.convert_to(np.array([[0.0, 1.0], [1.0, 2.0]])).tolist() == [[0, 0], [2, 4]]
+
+
+def test_branch_values():
+    cont = Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32)
+    trafo = branch(cont, (3, 5))
+
+    # padded per-branch values; the padding of the first branch is ignored
+    q = np.array([[0.0, 1.0, 0.0, 9.0, 9.0], [0.0, 0.0, 0.0, 0.0, 1.0]])
+    assert trafo.convert_from(q) == pytest.approx([0.5, 2.0])
+    assert trafo.convert_from(np.stack([q, q])) == pytest.approx(np.array([[0.5, 2.0], [0.5, 2.0]]))
+
+    # list of per-branch values
+    assert trafo.convert_from([np.array([0.0, 0.0, 1.0]), np.array([1.0, 0.0, 0.0, 0.0, 0.0])]) == \
+        pytest.approx([1.0, 1.0])
+
+    # integer values are values, too
+    assert trafo.convert_from(q.astype(int) * 2) == pytest.approx([0.5, 2.0])
+
+    with pytest.raises(ValueError):
+        trafo.convert_from([4, 0])
+    with pytest.raises(ValueError):
+        trafo.convert_from([0, -1])
+
+
+def test_branch_square():
+    # as many steps as branches: a single 2d array are values, a batch of them is a batch of indices
+    trafo = branch(Box(np.array([0.0, 1.0]), np.array([1.0, 2.0]), dtype=np.float32), 2)
+    assert trafo.convert_from(np.array([[0, 1], [1, 0]])) == pytest.approx([1.0, 1.0])
+    assert trafo.convert_from.batch(np.array([[0, 1], [1, 0]])) == pytest.approx(np.array([[0.0, 2.0],
+                                                                                           [1.0, 1.0]]))
+    values = np.array([[[0, 1], [1, 0]]] * 3)
+    assert trafo.convert_from.batch(values) == pytest.approx(np.array([[1.0, 1.0]] * 3))
+
+
+def test_branch_shapes():
+    from space_wrappers.tests.space_equal import expects
+
+    cont = Box(np.array([0.0]), np.array([1.0]), dtype=np.float32)
+    trafo = branch(cont, 3)
+    assert trafo.target == expects(MultiDiscrete([3]))
+    check_convert(trafo, [1], [0.5])
+
+    cont = Box(0.0, 1.0, shape=(2, 2), dtype=np.float32)
+    trafo = branch(cont, 3)
+    assert trafo.target == expects(MultiDiscrete([3, 3, 3, 3]))
+    assert trafo.convert_from([0, 1, 2, 0]) == pytest.approx(np.array([[0.0, 0.5], [1.0, 0.0]]))
+
+    with pytest.raises(TypeError):
+        branch(Discrete(3), 3)
+
+    with pytest.raises(ValueError):
+        branch(cont, 1)
+
+
 # flatten
 def test_flatten_single():
     start = Discrete(5)
@@ -126,6 +202,19 @@ def test_flatten_discrete():
     assert trafo.convert_to((1, 0, 1)) == trafo.convert_to([1, 0, 1])
 
 
+def test_flatten_discrete_large():
+    # nothing of the size of the flat space is built
+    md = MultiDiscrete([10] * 15)
+    trafo = flatten(md)
+    assert trafo.target == Discrete(10 ** 15)
+    assert trafo.convert_to([1, 2, 3, 4, 5, 6, 7, 8, 9, 0, 1, 2, 3, 4, 5]) == 123456789012345
+    assert trafo.convert_from(123456789012345) == (1, 2, 3, 4, 5, 6, 7, 8, 9, 0, 1, 2, 3, 4, 5)
+    batch = np.array([[0] * 15, [9] * 15])
+    flat = batched(trafo.convert_to)(batch)
+    assert list(flat) == [0, 10 ** 15 - 1]
+    assert (batched(trafo.convert_from)(flat) == batch).all()
+
+
 def test_flatten_continuous():
     ct = Box(np.zeros((2,2)), np.ones((2, 2)), dtype=np.float32)
     trafo = flatten(ct)
@@ -225,3 +314,217 @@ def test_rescale_inf():
 
     assert trafo.target == Box(np.array([1.0, -np.inf]), np.array([3.0, np.inf]), dtype=np.float32)
     check_convert(trafo, [1.0, 12.0], [-1.0, 12.0])
+
+
+# quantize
+def test_quantize_box():
+    s = Box(np.array([0.0, -1.0]), np.array([1.0, 1.0]), dtype=np.float32)
+    trafo = quantize(s, np.uint8)
+
+    assert trafo.target == Box(np.zeros(2, dtype=np.uint8), np.full(2, 255, dtype=np.uint8), dtype=np.uint8)
+    q = trafo.convert_to(np.array([0.0, 1.0]))
+    assert q.dtype == np.uint8
+    assert list(q) == [0, 255]
+    assert trafo.convert_from(q) == pytest.approx([0.0, 1.0])
+
+    # out of range values are clipped
+    assert list(trafo.convert_to(np.array([2.0, -5.0]))) == [255, 0]
+
+    # round trip error is bounded by half a quantization step
+    x = np.random.uniform(s.low, s.high, size=(100, 2))
+    y = trafo.convert_from(trafo.convert_to(x))
+    assert y.shape == (100, 2)
+    assert y.dtype == np.float32
+    assert (np.abs(y - x) <= (s.high - s.low) / 255 / 2 + 1e-6).all()
+
+
+def test_quantize_uint16():
+    s = Box(-2.0, 2.0, shape=(2, 3), dtype=np.float32)
+    trafo = quantize(s, np.uint16)
+    assert trafo.target.dtype == np.uint16
+    assert trafo.target.shape == (2, 3)
+    assert trafo.convert_from(trafo.convert_to(np.full((2, 3), 0.5))) == pytest.approx(np.full((2, 3), 0.5), abs=1e-4)
+
+
+def test_quantize_checks():
+    with pytest.raises(TypeError):
+        quantize(Discrete(5))
+
+    with pytest.raises(NotImplementedError):
+        quantize(Tuple([Box(0, 1, (1, 1), dtype=np.float32)]))
+
+    with pytest.raises(ValueError):
+        quantize(Box(np.array([0.0]), np.array([np.inf]), dtype=np.float32))
+
+    with pytest.raises(ValueError):
+        quantize(Box(np.array([0.0]), np.array([1.0]), dtype=np.float32), np.int32)
+
+
+# downsample
+def test_downsample_mean():
+    s = Box(0.0, 1.0, shape=(5, 4), dtype=np.float32)
+    trafo = downsample(s, 2)
+    assert trafo.target == Box(0.0, 1.0, shape=(2, 2), dtype=np.float32)
+
+    x = np.arange(20, dtype=np.float32).reshape(5, 4)
+    expected = x[:4].reshape(2, 2, 2, 2).mean(axis=(1, 3))
+    assert trafo.convert_to(x) == pytest.approx(expected)
+    # batches
+    assert trafo.convert_to(np.stack([x, 2 * x])) == pytest.approx(np.stack([expected, 2 * expected]))
+    # the image is restored by repeating pixels
+    assert trafo.convert_from(expected).shape == (5, 4)
+    assert trafo.convert_from(expected)[4, 3] == expected[1, 1]
+
+
+def test_downsample_max_rgb():
+    s = Box(0, 255, shape=(4, 6, 3), dtype=np.uint8)
+    trafo = downsample(s, (2, 3), mode="max")
+    assert trafo.target == Box(0, 255, shape=(2, 2, 3), dtype=np.uint8)
+
+    x = np.random.RandomState(0).randint(0, 256, size=(4, 6, 3)).astype(np.uint8)
+    y = trafo.convert_to(x)
+    assert y.dtype == np.uint8
+    assert (y == x.reshape(2, 2, 2, 3, 3).max(axis=(1, 3))).all()
+
+
+def test_downsample_grayscale():
+    s = Box(0, 255, shape=(4, 4, 3), dtype=np.uint8)
+    x = np.random.RandomState(0).randint(0, 256, size=(4, 4, 3)).astype(np.uint8)
+    weights = np.array([0.299, 0.587, 0.114])
+    for mode, reduce in [("mean", np.mean), ("max", np.max)]:
+        expected = np.dot(reduce(x.reshape(2, 2, 2, 2, 3), axis=(1, 3)), weights)
+        trafo = downsample(s, 2, mode=mode, grayscale=True, dtype=np.float32)
+        assert trafo.target.shape == (2, 2)
+        out = np.empty((2, 2), dtype=np.float32)
+        y = trafo.convert_to(x, out=out)
+        assert y is out
+        assert y == pytest.approx(expected, rel=1e-5)
+        assert trafo.convert_from(y).shape == (4, 4, 3)
+
+        # by default, integer images stay integer, and are rounded
+        trafo = downsample(s, 2, mode=mode, grayscale=True)
+        assert trafo.target == Box(0, 255, shape=(2, 2), dtype=np.uint8)
+        out = np.empty((2, 2), dtype=np.uint8)
+        assert trafo.convert_to(x, out=out) is out
+        assert out.tolist() == np.rint(expected).tolist()
+        assert trafo.convert_to(np.stack([x, x])).dtype == np.uint8
+
+
+def test_downsample_mean_uint8():
+    s = Box(0, 255, shape=(84, 84, 3), dtype=np.uint8)
+    trafo = downsample(s, 2)
+    assert trafo.target == Box(0, 255, shape=(42, 42, 3), dtype=np.uint8)
+    x = np.random.RandomState(0).randint(0, 256, size=(84, 84, 3)).astype(np.uint8)
+    y = trafo.convert_to(x)
+    assert y.nbytes == x.nbytes // 4
+    assert y.tolist() == np.rint(x.reshape(42, 2, 42, 2, 3).mean(axis=(1, 3))).tolist()
+
+
+def test_downsample_checks():
+    with pytest.raises(TypeError):
+        downsample(Discrete(3), 2)
+
+    with pytest.raises(ValueError):
+        downsample(Box(0.0, 1.0, shape=(4,), dtype=np.float32), 2)
+
+    with pytest.raises(ValueError):
+        downsample(Box(0.0, 1.0, shape=(4, 4), dtype=np.float32), 5)
+
+    with pytest.raises(ValueError):
+        downsample(Box(0.0, 1.0, shape=(4, 4), dtype=np.float32), 2, mode="median")
+
+    with pytest.raises(ValueError):
+        downsample(Box(0.0, 1.0, shape=(4, 4), dtype=np.float32), 2, grayscale=True)
+
+
+def test_one_hot_dense():
+    trafo = one_hot(Discrete(4))
+    assert trafo.target == Box(0.0, 1.0, shape=(4,), dtype=np.float32)
+    assert list(trafo.convert_to(2)) == [0, 0, 1, 0]
+    assert trafo.convert_from(trafo.convert_to(2)) == 2
+
+    out = np.full((3, 4), 7, dtype=np.float32)
+    result = trafo.convert_to.batch(np.array([0, 3, 0]), out=out)
+    assert result is out
+    assert out.tolist() == [[1, 0, 0, 0], [0, 0, 0, 1], [1, 0, 0, 0]]
+    assert list(batched(trafo.convert_from)(out)) == [0, 3, 0]
+
+
+def test_one_hot_sparse():
+    trafo = one_hot(Discrete(10 ** 6))
+    assert trafo.target == SparseOneHotSpace(10 ** 6)
+    single = trafo.convert_to(12345)
+    assert trafo.target.contains(single)
+    assert list(single.indices) == [12345]
+    assert single.toarray().shape == (1, 10 ** 6)
+    assert trafo.convert_from(single) == 12345
+
+    batch = batched(trafo.convert_to)(np.array([5, 999999]))
+    assert list(batch.indptr) == [0, 1, 2]
+    assert trafo.target.contains(batch)
+    assert not trafo.target.contains(SparseOneHot(np.array([10 ** 6]), single.indptr, single.size))
+    assert not trafo.target.contains(SparseOneHot(single.indices, single.indptr, 10))
+    assert not trafo.target.contains(np.zeros(10 ** 6))
+    assert trafo.target.contains(trafo.target.sample())
+    assert list(batched(trafo.convert_from)(batch)) == [5, 999999]
+    dense = one_hot(Discrete(8), sparse=True).convert_to.batch(np.array([1, 7])).toarray()
+    assert dense.tolist() == [[0, 1, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 1]]
+
+    with pytest.raises(TypeError):
+        one_hot(MultiDiscrete([2, 3]))
+
+
+def test_validated_disabled():
+    trafo = discretize(Box(0.0, 1.0, shape=(2,), dtype=np.float32), 3)
+    assert validated(trafo, 0.0) is trafo
+    with pytest.raises(ValueError):
+        validated(trafo, 1.5)
+
+
+def test_validated_checks():
+    space = Box(0.0, 1.0, shape=(2,), dtype=np.float32)
+    stats = ValidationStats()
+    trafo = validated(discretize(space, 3), 1.0, stats)
+    assert list(trafo.convert_to(np.array([0.0, 1.0]))) == [0, 2]
+    assert trafo.convert_from(np.array([1, 2])) == pytest.approx(np.array([0.5, 1.0]))
+    batched(trafo.convert_to)(np.array([[0.0, 0.5], [1.0, 1.0]]))
+    assert stats.checked == 3
+    assert stats.total_violations == 0
+
+    # a broken transform
+    def wrong_shape(x):
+        return np.zeros(3)
+    broken = Transform(space, Discrete(4), lambda x: 4, wrong_shape)
+    broken = validated(broken, 1.0, stats)
+    broken.convert_to(np.zeros(2))
+    broken.convert_from(0)
+    broken.convert_to.batch(np.zeros((2, 2)))
+    assert stats.violations[("convert_to", "bounds")] == 2
+    assert stats.violations[("convert_from", "shape")] == 1
+    assert stats.last_violation[:2] == ("convert_to", "bounds")
+
+    dtype_stats = validated(Transform(Box(0, 3, shape=(1,), dtype=np.int64), space, None,
+                                      lambda x: np.array([0.5])), 1.0).convert_from
+    dtype_stats(0)
+    assert dtype_stats.stats.violations == {("convert_from", "dtype"): 1}
+
+
+def test_validated_fraction():
+    space = Box(0.0, 1.0, shape=(2,), dtype=np.float32)
+    trafo = validated(rescale(space, -1.0, 1.0), 0.1, random_state=np.random.RandomState(5))
+    for i in range(2000):
+        trafo.convert_to(np.array([0.5, 0.5]))
+    assert 100 < trafo.convert_to.stats.checked < 300
+    assert trafo.convert_to.stats.total_violations == 0
+
+
+def test_validated_keeps_global_random_state():
+    space = Box(0.0, 1.0, shape=(2,), dtype=np.float32)
+    np.random.seed(7)
+    expected = np.random.uniform(size=3)
+    np.random.seed(7)
+    trafo = validated(rescale(space, -1.0, 1.0), 0.5)
+    for i in range(100):
+        trafo.convert_to(np.array([0.5, 0.5]))
+    assert trafo.convert_to.stats.checked > 0
+    assert np.random.uniform(size=3) == pytest.approx(expected)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from gym import spaces
+from space_wrappers.transform import discretize, flatten, one_hot, SparseOneHot
+from space_wrappers.vector import ThreadedVectorEnv, VectorWrapper, batch_buffer
+from space_wrappers.tests.envs import EchoEnv, WalkEnv
+
+
+def test_threaded_vector_env():
+    venv = ThreadedVectorEnv([lambda: EchoEnv(3), lambda: EchoEnv(2)])
+    assert venv.num_envs == 2
+    assert venv.observation_space == EchoEnv().observation_space
+
+    obs = venv.reset()
+    assert obs.shape == (2, 2, 1)
+    assert (obs == 0).all()
+
+    actions = np.array([[0.5, -0.5], [0.25, 1.0]])
+    obs, rew, done, info = venv.step(actions)
+    assert obs[:, :, 0] == pytest.approx(actions)
+    assert list(rew) == [1.0, 1.0]
+    assert list(done) == [False, False]
+    assert [i["t"] for i in info] == [1, 1]
+
+    obs2, rew, done, info = venv.step(actions)
+    assert list(done) == [False, True]
+    # second env has been reset
+    assert obs2[1] == pytest.approx(np.zeros((2, 1)))
+    assert info[1]["terminal_observation"] == pytest.approx(np.reshape(actions[1], (2, 1)))
+    # earlier results are not overwritten
+    assert obs[:, :, 0] == pytest.approx(actions)
+    venv.close()
+
+
+def test_threaded_vector_env_transforms():
+    env = EchoEnv()
+    action_trafo = discretize(env.action_space, 3)
+    obs_trafo = flatten(env.observation_space)
+    venv = ThreadedVectorEnv([EchoEnv] * 3, action_transform=action_trafo, observation_transform=obs_trafo,
+                             max_workers=2)
+    assert venv.action_space == action_trafo.target
+    assert venv.observation_space == obs_trafo.target
+
+    assert venv.reset().shape == (3, 2)
+    obs, rew, done, info = venv.step(np.array([[0, 2], [1, 1], [2, 0]]))
+    assert obs == pytest.approx(np.array([[-1.0, 1.0], [0.0, 0.0], [1.0, -1.0]]))
+
+    # terminal observations are converted, too
+    venv.step(np.array([[0, 2], [1, 1], [2, 0]]))
+    obs, rew, done, info = venv.step(np.array([[0, 2], [1, 1], [2, 0]]))
+    assert list(done) == [True] * 3
+    assert obs == pytest.approx(np.zeros((3, 2)))
+    assert info[2]["terminal_observation"] == pytest.approx(np.array([1.0, -1.0]))
+    venv.close()
+
+
+def test_threaded_vector_env_sparse_one_hot():
+    venv = ThreadedVectorEnv([WalkEnv] * 3, observation_transform=one_hot(spaces.Discrete(10), sparse=True))
+    obs = venv.reset()
+    assert list(obs.indices) == [0, 0, 0]
+    venv.step(np.array([1, 2, 3]))
+    obs, rew, done, info = venv.step(np.array([4, 5, 6]))
+    assert list(done) == [True] * 3
+    assert list(obs.indices) == [0, 0, 0]
+    terminal = info[1]["terminal_observation"]
+    assert isinstance(terminal, SparseOneHot)
+    assert venv.observation_space.contains(terminal)
+    assert list(terminal.indices) == [5]
+    venv.close()
+
+
+def test_masked_reset():
+    venv = ThreadedVectorEnv([EchoEnv] * 3)
+    venv.reset()
+    actions = np.full((3, 2), 0.5)
+    venv.step(actions)
+    obs = venv.reset(np.array([False, True, False]))
+    assert obs[:, 0, 0] == pytest.approx([0.5, 0.0, 0.5])
+    assert [env.t for env in venv.envs] == [1, 0, 1]
+    venv.close()
+
+
+def test_vector_wrapper():
+    venv = ThreadedVectorEnv([EchoEnv] * 2, copy=False)
+    wrapped = VectorWrapper(venv)
+    assert wrapped.num_envs == 2
+    assert wrapped.action_space == venv.action_space
+    assert wrapped.reset().shape == (2, 2, 1)
+    assert wrapped.step(np.zeros((2, 2)))[1].shape == (2,)
+    wrapped.close()
+
+
+def test_batch_buffer():
+    assert batch_buffer(spaces.Discrete(3), 4).shape == (4,)
+    assert batch_buffer(spaces.MultiDiscrete([3, 2]), 4).shape == (4, 2)
+    assert batch_buffer(spaces.MultiBinary(3), 4).shape == (4, 3)
+    a, b = batch_buffer(spaces.Tuple((spaces.Discrete(2), spaces.Box(0.0, 1.0, (2,), dtype=np.float32))), 5)
+    assert a.shape == (5,)
+    assert b.shape == (5, 2)
+    assert b.dtype == np.float32
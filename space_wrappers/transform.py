@@ -1,27 +1,156 @@
 # transform spaces
-from gym import Space, spaces
+from gym import spaces
 import numpy as np
-import itertools
 import numbers
-from collections import namedtuple
-from .classify import *
+from collections import namedtuple, Counter
+from .classify import space_info, is_discrete, is_flat, num_discrete_actions
+
+__all__ = ["Transform", "SparseOneHot", "SparseOneHotSpace", "batched", "discretize", "branch", "flatten", "rescale", "quantize",
+           "downsample", "one_hot", "ValidationStats", "validated"]
 
 Transform = namedtuple('Transform', ['original', 'target', 'convert_to', 'convert_from'])
 
 
+class SparseOneHot(object):
+    """
+    A one-hot vector of length `size`, or a batch of them, in compressed
+    sparse row (CSR) layout: row `i` has a one at column `indices[j]` for
+    `indptr[i] <= j < indptr[i+1]`. For one-hot rows, `indptr` is simply
+    `0, 1, ..., batch`.
+    This is deliberately not a `tuple`, which would make it look like a
+    batch of a `Tuple` space to the vector env helpers.
+    """
+    __slots__ = ("indices", "indptr", "size")
+
+    def __init__(self, indices, indptr, size):
+        self.indices = indices
+        self.indptr = indptr
+        self.size = size
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __repr__(self):
+        return "SparseOneHot(indices={}, indptr={}, size={})".format(self.indices, self.indptr, self.size)
+
+    def row(self, index):
+        """ Returns row `index` as a `SparseOneHot` with a single row, which shares `indices`. """
+        start, stop = self.indptr[index], self.indptr[index + 1]
+        return SparseOneHot(self.indices[start:stop], np.array([0, stop - start], dtype=np.int64), self.size)
+
+    def copy(self):
+        return SparseOneHot(self.indices.copy(), self.indptr.copy(), self.size)
+
+    def toarray(self, dtype=np.float32):
+        """ Converts to a dense array of shape `(batch, size)`. """
+        result = np.zeros((len(self), self.size), dtype=dtype)
+        result[np.repeat(np.arange(len(self)), np.diff(self.indptr)), self.indices] = 1
+        return result
+
+    def to_scipy(self, dtype=np.float32):
+        """ Converts to a `scipy.sparse.csr_matrix` (requires scipy). """
+        from scipy.sparse import csr_matrix
+        data = np.ones(len(self.indices), dtype=dtype)
+        return csr_matrix((data, self.indices, self.indptr), shape=(len(self), self.size))
+
+
+class SparseOneHotSpace(spaces.Space):
+    """
+    The space of `SparseOneHot` encoded one-hot vectors of length `n`, i.e.
+    the sparse counterpart of `Box(0, 1, (n,))` restricted to one-hot vectors.
+    Unlike the `Box`, it does not store any per-element bounds, so its size
+    does not depend on `n`. `contains` accepts a single vector as well as a
+    batch of them.
+    """
+    def __init__(self, n, dtype=np.float32):
+        self.n = int(n)
+        super(SparseOneHotSpace, self).__init__((self.n,), dtype)
+
+    def sample(self):
+        random = self.np_random
+        # `np.random.Generator` in newer, `RandomState` in older gym versions
+        index = random.integers(self.n) if hasattr(random, "integers") else random.randint(self.n)
+        return SparseOneHot(np.array([index], dtype=np.int64), np.arange(2, dtype=np.int64), self.n)
+
+    def contains(self, x):
+        if not isinstance(x, SparseOneHot) or x.size != self.n:
+            return False
+        indices, indptr = np.asarray(x.indices), np.asarray(x.indptr)
+        if indptr.ndim != 1 or len(indptr) < 2 or indptr[0] != 0 or len(indices) != indptr[-1]:
+            return False
+        # exactly one entry per row, within the vector
+        return bool((np.diff(indptr) == 1).all() and ((0 <= indices) & (indices < self.n)).all())
+
+    def __repr__(self):
+        return "SparseOneHotSpace({})".format(self.n)
+
+    def __eq__(self, other):
+        return isinstance(other, SparseOneHotSpace) and self.n == other.n and self.dtype == other.dtype
+
+
 # small helper functions.
 def _identity(x):
     return x
 
 
-class _Lookup(object):
-    def __init__(self, source):
-        self._source = source
+_identity.batch = _identity
+
+
+def batched(convert):
+    """
+    Returns a version of the conversion function `convert` (i.e. the
+    `convert_to` or `convert_from` of a `Transform`) that operates on a whole
+    batch of values at once. Batches are stacked along a new leading axis;
+    for `Tuple` spaces a batch is a tuple containing one batch per subspace.
+    The conversion functions created in this module provide vectorized
+    batch implementations; for any other callable, `convert` is applied to
+    each element of the batch in turn.
+    :param callable convert: The conversion function.
+    :return callable: The batched conversion function.
+    """
+    batch = getattr(convert, "batch", None)
+    if batch is not None:
+        return batch
+
+    def convert_each(x):
+        return np.asarray([convert(v) for v in x])
+    return convert_each
+
+
+class _Unravel(object):
+    # flat index -> multi index, enumerating the multi indices in row-major order
+    def __init__(self, dims):
+        self._dims = dims
+
+    def __call__(self, x):
+        return tuple(int(i) for i in np.unravel_index(int(x), self._dims))
+
+    def batch(self, x):
+        return np.stack(np.unravel_index(np.asarray(x), self._dims), axis=-1)
+
 
-    def __call__(self, key):
-        if isinstance(key, (np.ndarray, list)):
-            key = tuple(key)
-        return self._source[key]
+class _Ravel(object):
+    # multi index -> flat index
+    def __init__(self, dims):
+        self._dims = dims
+
+    def __call__(self, x):
+        return int(np.ravel_multi_index(tuple(np.asarray(x, dtype=np.int64)), self._dims))
+
+    def batch(self, x):
+        x = np.asarray(x)
+        return np.ravel_multi_index(tuple(np.moveaxis(x, -1, 0)), self._dims)
+
+
+class _Reshape(object):
+    def __init__(self, shape):
+        self._shape = tuple(shape)
+
+    def __call__(self, x):
+        return np.reshape(x, self._shape)
+
+    def batch(self, x):
+        return np.reshape(x, (-1,) + self._shape)
 
 
 class _LinearTransform(object):
@@ -33,6 +162,9 @@ class _LinearTransform(object):
     def __call__(self, x):
         return self._dtype(self._offset + self._slope * float(x))
 
+    def batch(self, x):
+        return (self._offset + self._slope * np.asarray(x, dtype=float)).astype(self._dtype)
+
 
 class _LinearTransformArray(object):
     def __init__(self, offset, slope, shape, dtype=float):
@@ -42,8 +174,213 @@ class _LinearTransformArray(object):
         self._shape = shape
 
     def __call__(self, x):
+        x = np.reshape(x, np.shape(self._offset))
         return np.reshape(self._offset + self._slope * x, self._shape).astype(self._dtype)
 
+    def batch(self, x):
+        x = np.asarray(x)
+        x = np.reshape(x, (x.shape[0], -1))
+        return np.reshape(self._offset + self._slope * x, (-1,) + tuple(self._shape)).astype(self._dtype)
+
+
+class _Quantize(object):
+    def __init__(self, offset, inv_scale, levels, dtype):
+        self._offset = offset
+        self._inv_scale = inv_scale
+        self._levels = levels
+        self._dtype = dtype
+
+    def __call__(self, x):
+        q = np.rint((np.asarray(x, dtype=np.float64) - self._offset) * self._inv_scale)
+        return np.clip(q, 0, self._levels).astype(self._dtype)
+
+    batch = __call__
+
+
+class _Dequantize(object):
+    def __init__(self, offset, scale, dtype):
+        self._offset = offset.astype(dtype)
+        self._scale = scale.astype(dtype)
+        self._dtype = dtype
+
+    def __call__(self, x):
+        # one multiply-add into a single result buffer; broadcasts over leading batch dimensions.
+        y = np.multiply(x, self._scale, dtype=self._dtype)
+        return np.add(y, self._offset, out=y)
+
+    batch = __call__
+
+
+class _BranchDecode(object):
+    def __init__(self, table, steps, shape):
+        self._table = table
+        self._steps = np.asarray(steps)
+        self._branches = np.arange(len(steps))
+        self._invalid = np.arange(table.shape[1])[None, :] >= self._steps[:, None]
+        self._shape = tuple(shape)
+
+    def _decode(self, x, values_rank):
+        if isinstance(x, (list, tuple)) and len(x) > 0 and np.ndim(x[0]) > 0 \
+                and len(set(np.shape(b)[-1] for b in x)) > 1:
+            # list of differently sized per-branch value arrays
+            x = np.stack([np.argmax(b, axis=-1) for b in x], axis=-1)
+        x = np.asarray(x)
+        # per-branch values, padded to the largest branch, have one more axis than indices.
+        if x.ndim >= values_rank and x.shape[-2:] == self._invalid.shape:
+            x = np.argmax(np.where(self._invalid, -np.inf, x), axis=-1)
+        elif ((x < 0) | (x >= self._steps)).any():
+            raise ValueError("Branch indices {} out of range for steps {}".format(x, self._steps))
+        return np.reshape(self._table[self._branches, x], x.shape[:-1] + self._shape)
+
+    def __call__(self, x):
+        return self._decode(x, 2)
+
+    def batch(self, x):
+        return self._decode(x, 3)
+
+
+class _BranchEncode(object):
+    def __init__(self, offset, slope, steps, shape):
+        self._offset = offset
+        self._slope = slope
+        self._max = np.asarray(steps) - 1
+        self._rank = len(shape)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        x = np.reshape(x, x.shape[:x.ndim - self._rank] + (-1,))
+        return np.clip(np.rint((x - self._offset) / self._slope), 0, self._max).astype(np.int64)
+
+    batch = __call__
+
+
+class _Pool(object):
+    def __init__(self, factor, channels, mode, weights, dtype, work_dtype):
+        self._factor = factor
+        self._channels = channels
+        self._mode = mode
+        self._weights = weights
+        self._dtype = dtype
+        # averages of integer images are computed in floating point, and rounded.
+        self._round = np.issubdtype(dtype, np.integer) and (mode == "mean" or weights is not None)
+        self._work_dtype = work_dtype
+
+    def _blocks(self, x):
+        # view of shape (..., h, w, [C], fy, fx) onto the image, without copying
+        fy, fx = self._factor
+        rank = 2 if self._channels is None else 3
+        lead = x.shape[:x.ndim - rank]
+        h, w = x.shape[len(lead)] // fy, x.shape[len(lead) + 1] // fx
+        strides = x.strides
+        sy, sx = strides[len(lead)], strides[len(lead) + 1]
+        shape = lead + (h, w) + x.shape[len(lead) + 2:] + (fy, fx)
+        strides = strides[:len(lead)] + (sy * fy, sx * fx) + strides[len(lead) + 2:] + (sy, sx)
+        return np.lib.stride_tricks.as_strided(x, shape=shape, strides=strides, writeable=False)
+
+    def __call__(self, x, out=None):
+        blocks = self._blocks(np.asarray(x))
+        if not self._round:
+            result = self._reduce(blocks, out)
+            return result if result.dtype == self._dtype else result.astype(self._dtype)
+        result = np.rint(self._reduce(blocks, None))
+        if out is None:
+            return result.astype(self._dtype)
+        np.copyto(out, result, casting="unsafe")
+        return out
+
+    def _reduce(self, blocks, out):
+        if self._mode == "mean":
+            if self._weights is not None:
+                # average and channel reduction in a single pass
+                weights = (self._weights / float(self._factor[0] * self._factor[1])).astype(self._work_dtype)
+                return np.einsum("...cyx,c->...", blocks, weights, out=out)
+            return np.mean(blocks, axis=(-2, -1), dtype=self._work_dtype, out=out)
+
+        if self._weights is not None:
+            weights = self._weights.astype(self._work_dtype)
+            return np.einsum("...c,c->...", np.max(blocks, axis=(-2, -1)), weights, out=out)
+        return np.max(blocks, axis=(-2, -1), out=out)
+
+    batch = __call__
+
+
+class _Upsample(object):
+    def __init__(self, factor, shape, rank, dtype):
+        self._factor = factor
+        self._shape = tuple(shape)
+        self._rank = rank
+        self._dtype = dtype
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        fy, fx = self._factor
+        lead = x.ndim - self._rank
+        x = np.repeat(np.repeat(x, fy, axis=lead), fx, axis=lead + 1)
+        if self._rank < len(self._shape):
+            # restore the color channels of grayscale images
+            x = np.repeat(x[..., None], self._shape[2], axis=-1)
+        # edge padding for the rows/columns that were cropped
+        missing = [(0, 0)] * x.ndim
+        missing[lead] = (0, self._shape[0] - x.shape[lead])
+        missing[lead + 1] = (0, self._shape[1] - x.shape[lead + 1])
+        return np.pad(x, missing, mode="edge").astype(self._dtype)
+
+    batch = __call__
+
+
+class _OneHot(object):
+    def __init__(self, n, dtype):
+        self._n = n
+        self._dtype = dtype
+
+    def __call__(self, x, out=None):
+        if out is None:
+            out = np.zeros(self._n, dtype=self._dtype)
+        else:
+            out.fill(0)
+        out[x] = 1
+        return out
+
+    def batch(self, x, out=None):
+        x = np.asarray(x)
+        if out is None:
+            out = np.zeros((len(x), self._n), dtype=self._dtype)
+        else:
+            out.fill(0)
+        out[np.arange(len(x)), x] = 1
+        return out
+
+
+class _OneHotIndex(object):
+    def __call__(self, x):
+        return int(np.argmax(x))
+
+    def batch(self, x):
+        return np.argmax(x, axis=-1)
+
+
+class _SparseOneHot(object):
+    def __init__(self, n):
+        self._n = n
+        self._indptr = np.arange(2, dtype=np.int64)
+
+    def __call__(self, x):
+        return SparseOneHot(np.array([x], dtype=np.int64), self._indptr, self._n)
+
+    def batch(self, x):
+        indices = np.array(x, dtype=np.int64)
+        if len(self._indptr) != len(indices) + 1:
+            self._indptr = np.arange(len(indices) + 1, dtype=np.int64)
+        return SparseOneHot(indices, self._indptr, self._n)
+
+
+class _SparseIndex(object):
+    def __call__(self, x):
+        return int(x.indices[0])
+
+    def batch(self, x):
+        return x.indices
+
 
 class _FlattenTuple(object):
     def __init__(self, subspace_trafos):
@@ -52,20 +389,23 @@ class _FlattenTuple(object):
     def __call__(self, x):
         return np.concatenate([trafo.convert_to(val) for trafo, val in zip(self._subspaces, x)])
 
+    def batch(self, x):
+        parts = [batched(trafo.convert_to)(val) for trafo, val in zip(self._subspaces, x)]
+        return np.concatenate([np.reshape(p, (len(p), -1)) for p in parts], axis=1)
+
 
 class _DecomposeTuple(object):
-    def __init__(self, subspace_trafos):
+    def __init__(self, subspace_trafos, offsets):
         self._subspaces = subspace_trafos
+        self._slices = [slice(start, start + space_info(ss.target).flat_size)
+                        for ss, start in zip(subspace_trafos, offsets)]
 
     def __call__(self, x):
-        last_pos = 0
-        decomposed = []
-        for ss in self._subspaces:
-            n = ss.target.low.size
-            d = x[last_pos:last_pos+n]
-            last_pos += n
-            decomposed.append(ss.convert_from(d))
-        return tuple(decomposed)
+        return tuple(ss.convert_from(x[s]) for ss, s in zip(self._subspaces, self._slices))
+
+    def batch(self, x):
+        x = np.asarray(x)
+        return tuple(batched(ss.convert_from)(x[:, s]) for ss, s in zip(self._subspaces, self._slices))
 
 
 # Discretization 
@@ -123,7 +463,8 @@ def discretize(space, steps):
                 raise ValueError("Supplied steps {} have invalid shape, expected {}".format(steps, steps.shape,
                                                                                             space.shape))
 
-            discrete_space = spaces.MultiDiscrete(steps.flatten())
+            steps = steps.flatten()
+            discrete_space = spaces.MultiDiscrete(steps)
             lo = space.low.flatten()
             hi = space.high.flatten()
 
@@ -135,6 +476,50 @@ def discretize(space, steps):
     raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))  # pragma: no cover
 
 
+# Branching
+def branch(space, steps):
+    """
+    Discretizes each dimension of the continuous `space` into its own
+    discrete "branch", as in action branching architectures. In contrast to
+    `flatten(discretize(space, steps))`, the number of discrete values that
+    an agent has to produce grows only linearly with the number of dimensions.
+    The target space is a `MultiDiscrete` with one entry per element of
+    `space`, even for single element spaces. Besides an array of indices,
+    `convert_from` also accepts per-branch values (e.g. Q-values or logits),
+    either as an array of shape `(..., branches, max(steps))` (entries beyond
+    the size of a branch are ignored), or as a list with one array of shape
+    `(..., steps[i])` per branch, and selects the index with the largest
+    value in each branch. Indices and values are told apart by their shape,
+    not their dtype; indices outside of a branch raise a `ValueError`. It
+    handles batches (along leading dimensions) with a single argmax and table
+    lookup; the `batch` variant interprets a two-dimensional array as a batch
+    of indices even if `max(steps)` equals the number of branches.
+    :param gym.Space space: The space to be branched. Needs to be a `Box`.
+    :param int|Iterable steps: The number of discrete steps for each dimension,
+        as in `discretize`.
+    :return Transform: A `Transform` to the branched space.
+    :raises TypeError: If `space` is discrete.
+            ValueError: If the steps are invalid.
+    """
+    if is_discrete(space):
+        raise TypeError("Cannot branch discrete space {}".format(space))
+
+    # validates steps and provides the values of the individual steps
+    trafo = discretize(space, steps)
+    steps = num_discrete_actions(trafo.target)
+    max_steps = max(steps)
+    indices = np.repeat(np.arange(max_steps)[:, None], len(steps), axis=1)
+    if len(steps) == 1:
+        indices = indices[:, 0]
+    table = np.reshape(batched(trafo.convert_from)(indices), (max_steps, -1)).T.copy()
+
+    offset = table[:, 0]
+    slope = (space.high.flatten() - offset) / (np.asarray(steps) - 1.0)
+    branched_space = spaces.MultiDiscrete(list(steps))
+    return Transform(original=space, target=branched_space, convert_from=_BranchDecode(table, steps, space.shape),
+                     convert_to=_BranchEncode(offset, slope, steps, space.shape))
+
+
 # Flattening
 def flatten(space):
     """
@@ -144,7 +529,9 @@ def flatten(space):
     of possible values is created.
     Please be aware that the latter can be potentially pathological in case
     the input space has many discrete actions, as the number of single discrete
-    actions increases exponentially ("curse of dimensionality").
+    actions increases exponentially ("curse of dimensionality"). The conversions
+    themselves compute flat and multi indices arithmetically (in row-major
+    order), so they do not depend on the number of actions.
     :param gym.Space space: The space that will be flattened
     :return Transform: A transform object describing the transformation
             to the flattened space.
@@ -158,30 +545,22 @@ def flatten(space):
         return Transform(space, space, _identity, _identity)
 
     if isinstance(space, spaces.Box):
-        shape = space.low.shape
         lo = space.low.flatten()
         hi = space.high.flatten()
 
-        def convert(x):
-            return np.reshape(x, shape)
-
-        def back(x):
-            return np.reshape(x, lo.shape)
-
         flat_space = spaces.Box(low=lo, high=hi, dtype=space.dtype)
-        return Transform(original=space, target=flat_space, convert_from=convert, convert_to=back)
+        return Transform(original=space, target=flat_space,
+                         convert_from=_Reshape(space.low.shape), convert_to=_Reshape(lo.shape))
 
     elif isinstance(space, (spaces.MultiDiscrete, spaces.MultiBinary)):
-        if isinstance(space, spaces.MultiDiscrete):
-            ranges = [range(0, k, 1) for k in space.nvec]
-        elif isinstance(space, spaces.MultiBinary):  # pragma: no branch
-            ranges = [range(0, 2) for i in range(space.n)]
-        prod   = itertools.product(*ranges)
-        lookup = list(prod)
-        inverse_lookup = {value: key for (key, value) in enumerate(lookup)}
-        flat_space = spaces.Discrete(len(lookup))
+        # the flat index is computed arithmetically, so nothing of the size of the flat space is built.
+        dims = tuple(int(k) for k in num_discrete_actions(space))
+        size = 1
+        for k in dims:
+            size *= k
+        flat_space = spaces.Discrete(size)
         return Transform(original=space, target=flat_space,
-                         convert_from=_Lookup(lookup), convert_to=_Lookup(inverse_lookup))
+                         convert_from=_Unravel(dims), convert_to=_Ravel(dims))
 
     elif isinstance(space, spaces.Tuple):
         # first ensure all subspaces are flat.
@@ -189,7 +568,7 @@ def flatten(space):
         lo = np.concatenate([f.target.low for f in flat_subs])
         hi = np.concatenate([f.target.high for f in flat_subs])
         return Transform(space, target=spaces.Box(low=lo, high=hi), convert_to=_FlattenTuple(flat_subs),
-                         convert_from=_DecomposeTuple(flat_subs))
+                         convert_from=_DecomposeTuple(flat_subs, space_info(space).offsets))
 
     raise NotImplementedError("Does not know how to flatten {}".format(type(space)))  # pragma: no cover
 
@@ -256,5 +635,300 @@ def rescale(space, low, high):
     def back(x):
         return (x - lo) / scale_factor + offset
 
+    # both functions broadcast over leading batch dimensions
+    convert.batch = convert
+    back.batch = back
+
     scaled_space = spaces.Box(low, high, dtype=space.dtype)
     return Transform(original=space, target=scaled_space, convert_from=convert, convert_to=back)
+
+
+# quantize a bounded continuous space
+def quantize(space, dtype=np.uint8):
+    """
+    Creates a quantized version of the continuous `space`, in which each
+    value is stored as an unsigned integer of type `dtype`. The full range
+    of the integer type is mapped linearly onto the (finite) bounds of
+    `space`, so that `convert_to` rounds to the nearest representable value
+    and `convert_from` recovers it with a single multiply-add. Both
+    conversions broadcast over leading batch dimensions, so a whole batch of
+    stored observations can be dequantized in one call.
+    :param gym.Space space: The space to quantize. Needs to be a `Box`
+        with finite bounds.
+    :param dtype: The storage type, `np.uint8` or `np.uint16`.
+    :return Transform: A `Transform` to the quantized space.
+    :raises TypeError: If `space` is discrete.
+            ValueError: If `dtype` is not supported or the bounds of `space`
+            are not finite.
+    """
+    if is_discrete(space):
+        raise TypeError("Cannot quantize discrete space {}".format(space))
+
+    if not isinstance(space, spaces.Box):
+        raise NotImplementedError()
+
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype(np.uint8), np.dtype(np.uint16)):
+        raise ValueError("Can only quantize to uint8 or uint16, got {}".format(dtype))
+
+    if not space_info(space).bounded:
+        raise ValueError("Cannot quantize space {} with infinite bounds".format(space))
+    lo = space.low.astype(np.float64)
+    hi = space.high.astype(np.float64)
+
+    levels = np.iinfo(dtype).max
+    scale = (hi - lo) / levels
+    # degenerate dimensions (low == high) always map to zero.
+    inv_scale = np.divide(1.0, scale, out=np.zeros_like(scale), where=scale != 0)
+
+    # dequantized values are floating point, even if the original space was not.
+    out_dtype = space.dtype if np.issubdtype(space.dtype, np.floating) else np.dtype(np.float32)
+
+    quantized_space = spaces.Box(np.zeros(space.shape, dtype=dtype), np.full(space.shape, levels, dtype=dtype),
+                                 dtype=dtype)
+    return Transform(original=space, target=quantized_space,
+                     convert_to=_Quantize(lo, inv_scale, levels, dtype),
+                     convert_from=_Dequantize(lo, scale, out_dtype))
+
+
+# downsample images
+_GRAYSCALE_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def downsample(space, factor, mode="mean", grayscale=False, dtype=None):
+    """
+    Creates a downsampled version of the image `space`, of shape `(H, W)`
+    or `(H, W, C)`, by pooling over non-overlapping blocks of `factor` pixels.
+    Rows and columns that do not fill a complete block are dropped. If
+    `grayscale` is set, the three color channels are additionally reduced to
+    a single luminance value, and the channel axis is removed.
+    `convert_to` reads the blocks through a strided view of the image and
+    computes pooling and grayscale conversion in a single reduction, writing
+    into the optional preallocated array `out`; it also works on batches of
+    images. `convert_from` restores the original shape by repeating pixels.
+    By default, the downsampled images keep the dtype of `space`; for integer
+    images, averages are rounded to the nearest integer, so that e.g. uint8
+    frames stay uint8 and downsampling reduces their size by the full factor.
+    :param gym.Space space: The image space. Needs to be a `Box` of rank 2 or 3.
+    :param int|tuple factor: The pooling factor, for both axes or as `(fy, fx)`.
+    :param str mode: The pooling operation, `"mean"` or `"max"`.
+    :param bool grayscale: Whether to convert RGB images to grayscale.
+    :param dtype: The dtype of the downsampled images. Defaults to the dtype of `space`.
+    :return Transform: A `Transform` to the downsampled space.
+    :raises TypeError: If `space` is discrete.
+            ValueError: If the arguments do not fit to `space`.
+    """
+    if is_discrete(space):
+        raise TypeError("Cannot downsample discrete space {}".format(space))
+
+    if not isinstance(space, spaces.Box):
+        raise NotImplementedError()
+
+    if len(space.shape) not in (2, 3):
+        raise ValueError("Expected an image space of rank 2 or 3, got {}".format(space))
+
+    if isinstance(factor, numbers.Integral):
+        factor = (factor, factor)
+    factor = tuple(int(f) for f in factor)
+    if len(factor) != 2 or min(factor) < 1 or factor[0] > space.shape[0] or factor[1] > space.shape[1]:
+        raise ValueError("Invalid downsampling factor {} for space {}".format(factor, space))
+
+    if mode not in ("mean", "max"):
+        raise ValueError("Unknown pooling mode {}".format(mode))
+
+    channels = space.shape[2] if len(space.shape) == 3 else None
+    weights = None
+    if grayscale:
+        if channels != 3:
+            raise ValueError("Grayscale conversion needs an RGB image space, got {}".format(space))
+        weights = _GRAYSCALE_WEIGHTS
+
+    dtype = space.dtype if dtype is None else np.dtype(dtype)
+    # floating point targets are computed in their own precision; integer ones in one wide enough
+    work_dtype = dtype if np.issubdtype(dtype, np.floating) else np.result_type(np.float32, space.dtype)
+    pool = _Pool(factor, channels, mode, weights, dtype, work_dtype)
+    low = pool(space.low)
+    high = pool(space.high)
+    downsampled_space = spaces.Box(low, high, dtype=dtype)
+    return Transform(original=space, target=downsampled_space, convert_to=pool,
+                     convert_from=_Upsample(factor, space.shape, len(low.shape), space.dtype))
+
+
+# one-hot encoding
+def one_hot(space, sparse=None, dtype=np.float32, max_dense=4096, n=None):
+    """
+    Creates a one-hot encoding of the `Discrete` space `space`. In dense
+    mode, the target is `Box(0, 1, (n,))`, and `convert_to` writes the
+    one-hot vector (or, for batches, the `(batch, n)` matrix) into the
+    optional preallocated array `out`. In sparse mode, the target is a
+    `SparseOneHotSpace`, and values are returned as `SparseOneHot` index
+    arrays in CSR layout, so that neither the space, nor a single
+    observation, nor a batch costs memory proportional to `n`.
+    `convert_from` recovers the indices from either form.
+    :param gym.Space space: The space to encode. Needs to be `Discrete`; use
+        `flatten()` first for other discrete spaces.
+    :param bool sparse: Whether to use the sparse encoding. By default, it is
+        used if the space has more than `max_dense` values.
+    :param dtype: The dtype of the dense encoding.
+    :param int max_dense: The largest space for which the dense encoding is the default.
+    :param int n: The length of the one-hot vectors. Defaults to `space.n`; spaces that
+        grow, such as that of `AdaptiveDiscretizedObservationWrapper`, need their final size.
+    :return Transform: A `Transform` to the one-hot space.
+    :raises TypeError: If `space` is not `Discrete`.
+            ValueError: If `n` is less than `space.n`.
+    """
+    if not isinstance(space, spaces.Discrete):
+        raise TypeError("Can only one-hot encode Discrete spaces, got {}".format(space))
+
+    if n is None:
+        n = space.n
+    elif n < space.n:
+        raise ValueError("Cannot one-hot encode {} in {} values".format(space, n))
+    n = int(n)
+    if sparse is None:
+        sparse = n > max_dense
+    dtype = np.dtype(dtype)
+    if sparse:
+        return Transform(original=space, target=SparseOneHotSpace(n, dtype), convert_to=_SparseOneHot(n),
+                         convert_from=_SparseIndex())
+    one_hot_space = spaces.Box(np.zeros(n, dtype=dtype), np.ones(n, dtype=dtype), dtype=dtype)
+    return Transform(original=space, target=one_hot_space, convert_to=_OneHot(n, dtype),
+                     convert_from=_OneHotIndex())
+
+
+# sampled validation of conversion results
+class ValidationStats(object):
+    """
+    Counters of the checks made by the conversion functions of a
+    `validated()` transform. `violations` counts failed checks by
+    `(direction, kind)`, where direction is `"convert_to"` or
+    `"convert_from"` and kind is one of `"type"`, `"shape"`, `"dtype"`,
+    `"bounds"` or `"contains"`. The most recent offending value is kept as
+    `last_violation`.
+    """
+    def __init__(self):
+        self.checked = 0
+        self.violations = Counter()
+        self.last_violation = None
+
+    @property
+    def total_violations(self):
+        return sum(self.violations.values())
+
+    def record(self, direction, kind, value):
+        self.checked += 1
+        if kind is not None:
+            self.violations[(direction, kind)] += 1
+            self.last_violation = (direction, kind, value)
+
+
+def _violation(space, x, batch):
+    # returns the kind of the first violation of `x` (or the batch `x`) being in `space`, or None.
+    if isinstance(space, spaces.Tuple):
+        if not isinstance(x, tuple) or len(x) != len(space.spaces):
+            return "type"
+        for sub, value in zip(space.spaces, x):
+            kind = _violation(sub, value, batch)
+            if kind is not None:
+                return kind
+        return None
+
+    if isinstance(space, SparseOneHotSpace):
+        # handles single vectors and batches alike
+        return None if space.contains(x) else "contains"
+
+    if isinstance(space, spaces.Discrete):
+        low, high = 0, space.n - 1
+    elif isinstance(space, spaces.MultiDiscrete):
+        low, high = 0, np.asarray(space.nvec) - 1
+    elif isinstance(space, spaces.MultiBinary):
+        low, high = 0, 1
+    elif isinstance(space, spaces.Box):
+        low, high = space.low, space.high
+    else:
+        # no vectorized check available
+        values = x if batch else [x]
+        return None if all(space.contains(v) for v in values) else "contains"
+
+    info = space_info(space)
+    x = np.asarray(x)
+    if x.shape[1 if batch else 0:] != info.shape:
+        return "shape"
+    # like assigning to an array of the space's dtype, allow e.g. float64 values for float32 spaces.
+    if not np.can_cast(x.dtype, info.dtype, casting="same_kind"):
+        return "dtype"
+    if np.issubdtype(info.dtype, np.floating):
+        # compare at the precision of the space
+        x = x.astype(info.dtype)
+    # NaNs fail both comparisons
+    if not ((x >= low) & (x <= high)).all():
+        return "bounds"
+    return None
+
+
+class _Validated(object):
+    def __init__(self, convert, space, direction, fraction, stats, random_state):
+        self._convert = convert
+        self._space = space
+        self._direction = direction
+        self._fraction = fraction
+        self._random_state = random_state
+        self.stats = stats
+        # number of calls until the next check; geometrically distributed, so that each call is
+        # checked with probability `fraction`, but only one random number is drawn per check.
+        self._countdown = random_state.geometric(fraction)
+
+    def _due(self):
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self._random_state.geometric(self._fraction)
+        return True
+
+    def __call__(self, x, **kwargs):
+        y = self._convert(x, **kwargs)
+        if self._due():
+            self.stats.record(self._direction, _violation(self._space, y, False), y)
+        return y
+
+    def batch(self, x, **kwargs):
+        y = batched(self._convert)(x, **kwargs)
+        if self._due():
+            self.stats.record(self._direction, _violation(self._space, y, True), y)
+        return y
+
+
+def validated(trafo, fraction, stats=None, random_state=None):
+    """
+    Returns a version of `trafo` whose conversion functions check, for a
+    random `fraction` of the calls, that their result lies in the target
+    (for `convert_to`) or original (for `convert_from`) space. A batch
+    conversion counts as a single call, and is checked as a whole with
+    vectorized shape, dtype and bounds checks. Violations are counted in
+    `stats`, the conversion results are returned unchanged.
+    If `fraction` is zero, `trafo` itself is returned, so disabled
+    validation has no overhead at all.
+    :param Transform trafo: The transform to validate.
+    :param float fraction: The fraction of calls to check, in `[0, 1]`.
+    :param ValidationStats stats: The counters to update. If not given, a new
+        `ValidationStats` is created; it is available as the `stats` attribute
+        of both conversion functions.
+    :param random_state: A `np.random.Generator` or `np.random.RandomState`. Defaults
+        to a private generator, so that validation does not change the random numbers
+        drawn from the global numpy state by anything else.
+    :return Transform: The validated transform.
+    :raises ValueError: If `fraction` is not in `[0, 1]`.
+    """
+    if not 0 <= fraction <= 1:
+        raise ValueError("Validation fraction needs to be in [0, 1], got {}".format(fraction))
+    if fraction == 0:
+        return trafo
+    if stats is None:
+        stats = ValidationStats()
+    if random_state is None:
+        random_state = np.random.default_rng()
+    return Transform(original=trafo.original, target=trafo.target,
+                     convert_to=_Validated(trafo.convert_to, trafo.target, "convert_to", fraction, stats,
+                                           random_state),
+                     convert_from=_Validated(trafo.convert_from, trafo.original, "convert_from", fraction, stats,
+                                             random_state))
@@ -0,0 +1,230 @@
+from concurrent.futures import ThreadPoolExecutor
+from gym import spaces
+import numpy as np
+from .transform import batched, SparseOneHot
+
+__all__ = ["VectorEnv", "VectorWrapper", "ThreadedVectorEnv", "batch_buffer"]
+
+
+# In this file are environments that run several copies of an env side by side ("vector envs").
+# A vector env takes a batch of actions, one for each sub-env, and returns batches of
+# observations, rewards and done flags, stacked along a new leading axis (for `Tuple` spaces,
+# a tuple with one batch per subspace), together with a list of info dicts. Sub-envs whose
+# episode has ended are reset automatically; the last observation of the finished episode is
+# then available as `info["terminal_observation"]`.
+# Individual sub-envs can also be reset explicitly by passing a mask to `reset`, e.g. by wrappers
+# that end episodes themselves.
+
+
+class VectorEnv(object):
+    """
+    Base class for vector envs. `observation_space` and `action_space` are
+    the spaces of a single sub-env.
+    """
+    num_envs = None
+    observation_space = None
+    action_space = None
+
+    def reset(self, mask=None):
+        """
+        Resets all sub-envs, or those for which `mask` is set.
+        :param np.ndarray mask: Boolean array with one entry per sub-env.
+        :return: The batch of current observations of all sub-envs, i.e. the initial
+                 observations of those that have been reset.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def step(self, actions):
+        """
+        Steps all sub-envs.
+        :param actions: The batch of actions.
+        :return: A tuple of the batch of observations, array of rewards, array of done flags
+                 and list of info dicts.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def close(self):
+        pass
+
+
+class VectorWrapper(VectorEnv):
+    """
+    Base class for wrappers around vector envs. By default, all calls are
+    forwarded to the wrapped `venv`.
+    """
+    def __init__(self, venv):
+        self.venv = venv
+        self.num_envs = venv.num_envs
+        self.observation_space = venv.observation_space
+        self.action_space = venv.action_space
+
+    def reset(self, mask=None):
+        return self.venv.reset(mask)
+
+    def step(self, actions):
+        return self.venv.step(actions)
+
+    def close(self):
+        return self.venv.close()
+
+
+def batch_buffer(space, count):
+    """
+    Allocates a buffer that can hold a batch of `count` values of `space`.
+    :param gym.Space space: The space of the values.
+    :param int count: The batch size.
+    :return: An array, or for `Tuple` spaces a tuple of buffers.
+    """
+    if isinstance(space, spaces.Discrete):
+        return np.zeros(count, dtype=np.int64)
+    elif isinstance(space, spaces.MultiDiscrete):
+        return np.zeros((count,) + np.shape(space.nvec), dtype=np.int64)
+    elif isinstance(space, spaces.MultiBinary):
+        return np.zeros((count,) + tuple(np.atleast_1d(space.n)), dtype=np.int8)
+    elif isinstance(space, spaces.Box):
+        return np.zeros((count,) + space.shape, dtype=space.dtype)
+    elif isinstance(space, spaces.Tuple):
+        return tuple(batch_buffer(sub, count) for sub in space.spaces)
+
+    raise NotImplementedError("Unknown space {} of type {} supplied".format(space, type(space)))
+
+
+def _write(buffer, index, value):
+    if isinstance(buffer, tuple):
+        for b, v in zip(buffer, value):
+            _write(b, index, v)
+    else:
+        buffer[index] = value
+
+
+def _read(buffer, index):
+    if isinstance(buffer, tuple):
+        return tuple(_read(b, index) for b in buffer)
+    if isinstance(buffer, SparseOneHot):
+        return buffer.row(index)
+    return buffer[index]
+
+
+def _may_share_memory(a, b):
+    if isinstance(a, SparseOneHot):
+        return _may_share_memory((a.indices, a.indptr), b)
+    if isinstance(b, SparseOneHot):
+        return _may_share_memory(a, (b.indices, b.indptr))
+    if isinstance(a, tuple) or isinstance(b, tuple):
+        a = a if isinstance(a, tuple) else (a,)
+        b = b if isinstance(b, tuple) else (b,)
+        return any(_may_share_memory(x, y) for x in a for y in b)
+    return np.may_share_memory(a, b)
+
+
+def _copy(buffer):
+    if isinstance(buffer, tuple):
+        return tuple(_copy(b) for b in buffer)
+    return buffer.copy()
+
+
+class ThreadedVectorEnv(VectorEnv):
+    """
+    A vector env that steps its sub-envs concurrently on a thread pool.
+    This gives a speed-up for envs that release the GIL in their `step`
+    (e.g. physics engines implemented in C), without the cost of
+    transferring data between processes.
+    Optionally, an action and an observation `Transform` (as created by the
+    functions in `transform.py`) are applied once to the whole batch instead
+    of once per sub-env: Actions given to `step` are in the target space of
+    `action_transform`, and observations are returned in the target space of
+    `observation_transform`.
+    Results are gathered into preallocated batch arrays.
+    """
+    def __init__(self, env_fns, action_transform=None, observation_transform=None, max_workers=None, copy=True):
+        """
+        :param env_fns: List of functions, each of which creates one sub-env.
+        :param Transform action_transform: Transform whose `original` is the action space of the sub-envs.
+        :param Transform observation_transform: Transform whose `original` is the observation space of
+            the sub-envs.
+        :param int max_workers: Number of threads. Defaults to one per sub-env.
+        :param bool copy: Whether to return copies of the observation, reward and done batches. If set to
+            `False`, the preallocated arrays are returned, and will be overwritten by the next `step`.
+        """
+        self.envs = [fn() for fn in env_fns]
+        self.num_envs = len(self.envs)
+        env = self.envs[0]
+
+        self._convert_action = None
+        self.action_space = env.action_space
+        if action_transform is not None:
+            self._convert_action = batched(action_transform.convert_from)
+            self.action_space = action_transform.target
+
+        self._convert_observation = None
+        self.observation_space = env.observation_space
+        if observation_transform is not None:
+            self._convert_observation = batched(observation_transform.convert_to)
+            self.observation_space = observation_transform.target
+
+        self._copy = copy
+        self._env_observation_space = env.observation_space
+        self._observations = batch_buffer(env.observation_space, self.num_envs)
+        self._rewards = np.zeros(self.num_envs, dtype=np.float64)
+        self._dones = np.zeros(self.num_envs, dtype=np.bool_)
+        self._infos = [{} for i in range(self.num_envs)]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or self.num_envs)
+
+    def reset(self, mask=None):
+        indices = range(self.num_envs) if mask is None else np.flatnonzero(mask)
+        list(self._executor.map(self._reset_env, indices))
+        return self._gather_observations()
+
+    def step(self, actions):
+        if self._convert_action is not None:
+            actions = self._convert_action(actions)
+        actions = [_read(actions, i) for i in range(self.num_envs)]
+        list(self._executor.map(self._step_env, range(self.num_envs), actions))
+        infos = list(self._infos)
+        if self._convert_observation is not None and self._dones.any():
+            self._convert_terminal_observations(infos)
+
+        rewards, dones = self._rewards, self._dones
+        if self._copy:
+            rewards, dones = rewards.copy(), dones.copy()
+        return self._gather_observations(), rewards, dones, infos
+
+    def close(self):
+        self._executor.shutdown()
+        for env in self.envs:
+            env.close()
+
+    def _gather_observations(self):
+        observations = self._observations
+        if self._convert_observation is not None:
+            observations = self._convert_observation(observations)
+        # conversions such as reshaping may return views of the buffer
+        if self._copy and _may_share_memory(observations, self._observations):
+            observations = _copy(observations)
+        return observations
+
+    def _convert_terminal_observations(self, infos):
+        # terminal observations have to be in the same space as the batch, so they are converted,
+        # as a batch of their own.
+        done = np.flatnonzero(self._dones)
+        terminal = batch_buffer(self._env_observation_space, len(done))
+        for j, i in enumerate(done):
+            _write(terminal, j, infos[i]["terminal_observation"])
+        terminal = self._convert_observation(terminal)
+        for j, i in enumerate(done):
+            infos[i]["terminal_observation"] = _copy(_read(terminal, j))
+
+    def _reset_env(self, index):
+        _write(self._observations, index, self.envs[index].reset())
+
+    def _step_env(self, index, action):
+        env = self.envs[index]
+        obs, reward, done, info = env.step(action)
+        if done:
+            info = dict(info)
+            info["terminal_observation"] = obs
+            obs = env.reset()
+        _write(self._observations, index, obs)
+        self._rewards[index] = reward
+        self._dones[index] = done
+        self._infos[index] = info